@@ -0,0 +1,239 @@
+import json
+import math
+import os
+
+import pandas as pd
+
+# ===============================
+# DETECCIÓN DE PICOS EN LÍNEA (EWMA + CUSUM)
+# ===============================
+# Cada llave (dimensión, valor) guarda solo unos pocos números:
+#   periodo abierto, conteo del periodo, EWMA, varianza EWMA, CUSUM
+# Las filas nuevas actualizan el estado en O(1) y el estado se guarda
+# en un JSON compacto, de modo que nunca se vuelve a leer el histórico.
+# Marca de agua: por cada día, cuántas veces se ingirió cada huella de
+# fila (hash de las columnas que usa el detector). Una fila es nueva si
+# su huella aparece ese día más veces que las ya ingeridas, sin importar
+# el orden del libro: las filas insertadas en cualquier posición, con
+# fecha atrasada, o un libro reordenado no se pierden ni se cuentan dos
+# veces (si su semana sigue abierta actualizan los contadores).
+
+ARCHIVO_ESTADO = "alertas_estado.json"
+
+ALFA = 0.3           # peso del periodo más reciente en la EWMA
+Z_PICO = 3.0         # desviaciones sobre la EWMA para alertar en línea
+CUSUM_K = 0.5        # holgura del CUSUM (en desviaciones)
+CUSUM_H = 4.0        # umbral del CUSUM (en desviaciones)
+MIN_CONTEO = 3       # no alertar por debajo de este conteo semanal
+MAX_HUECO = 52       # semanas vacías que se aplican al cerrar un hueco
+
+
+def periodo_semana(fecha):
+    iso = fecha.isocalendar()
+    return iso[0] * 100 + iso[1]
+
+
+def _semanas_entre(p1, p2):
+    if p2 <= p1:
+        return 0
+    d1 = pd.Timestamp.fromisocalendar(p1 // 100, p1 % 100, 1)
+    d2 = pd.Timestamp.fromisocalendar(p2 // 100, p2 % 100, 1)
+    return (d2 - d1).days // 7
+
+
+class DetectorPicos:
+
+    def __init__(self, dimensiones, col_fecha, col_blanco='blanco_norm',
+                 alfa=ALFA, z_pico=Z_PICO):
+        self.dimensiones = list(dimensiones)
+        self.col_fecha = col_fecha
+        self.col_blanco = col_blanco
+        self.alfa = alfa
+        self.z_pico = z_pico
+        # llave -> [periodo, conteo, ewma, var, cusum, alertado]
+        self.estado = {}
+        self.ultima_fecha = None
+        # 'AAAA-MM-DD' -> {huella: veces ingerida}
+        self.huellas_por_dia = {}
+        # estado guardado sin conteo por día: todo lo anterior ya se ingirió
+        self._ingerido_hasta = None
+
+    # -------------------------------
+    # Persistencia
+    # -------------------------------
+    @classmethod
+    def cargar(cls, ruta, dimensiones, col_fecha, **kwargs):
+        detector = cls(dimensiones, col_fecha, **kwargs)
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                datos = json.load(f)
+            detector.estado = datos['estado']
+            if datos.get('ultima_fecha'):
+                detector.ultima_fecha = pd.Timestamp(datos['ultima_fecha'])
+            detector.huellas_por_dia = datos.get('huellas_por_dia', {})
+            if datos.get('ingerido_hasta'):
+                detector._ingerido_hasta = pd.Timestamp(datos['ingerido_hasta'])
+            elif 'huellas_por_dia' not in datos:
+                detector._ingerido_hasta = detector.ultima_fecha
+        return detector
+
+    def guardar(self, ruta):
+        datos = {
+            'ultima_fecha': (
+                self.ultima_fecha.isoformat() if self.ultima_fecha is not None
+                else None
+            ),
+            'huellas_por_dia': self.huellas_por_dia,
+            'ingerido_hasta': (
+                self._ingerido_hasta.isoformat()
+                if self._ingerido_hasta is not None else None
+            ),
+            'estado': self.estado
+        }
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, separators=(',', ':'))
+
+    # -------------------------------
+    # Llaves de una fila
+    # -------------------------------
+    def _llaves(self, fila):
+        blanco = fila.get(self.col_blanco)
+        llaves = []
+        if blanco is not None:
+            llaves.append(f'{self.col_blanco}|{blanco}')
+        for dim in self.dimensiones:
+            valor = fila.get(dim)
+            if valor is None:
+                continue
+            llaves.append(f'{dim}|{valor}')
+            if blanco is not None:
+                llaves.append(f'{dim}|{valor}|{blanco}')
+        return llaves
+
+    # -------------------------------
+    # Cierre de periodo: actualiza EWMA, varianza y CUSUM
+    # -------------------------------
+    def _cerrar(self, st, conteo):
+        _, _, ewma, var, cusum, _ = st
+        sd = math.sqrt(var) if var > 0 else 1.0
+
+        alarma_cusum = False
+        if ewma is not None:
+            cusum = max(0.0, cusum + (conteo - ewma) / sd - CUSUM_K)
+            alarma_cusum = cusum > CUSUM_H and conteo >= MIN_CONTEO
+            if alarma_cusum:
+                cusum = 0.0
+            diff = conteo - ewma
+            ewma = ewma + self.alfa * diff
+            var = (1 - self.alfa) * (var + self.alfa * diff * diff)
+        else:
+            ewma = float(conteo)
+
+        st[2], st[3], st[4] = ewma, var, cusum
+        return alarma_cusum
+
+    def _avanzar(self, llave, st, periodo, alertas):
+        esperado = st[2]
+        if st[1] and self._cerrar(st, st[1]):
+            alertas.append({
+                'llave': llave, 'periodo': st[0], 'conteo': st[1],
+                'esperado': round(esperado, 2), 'tipo': 'CUSUM'
+            })
+        # semanas sin interceptaciones entre el periodo cerrado y el nuevo
+        huecos = min(_semanas_entre(st[0], periodo) - 1, MAX_HUECO)
+        for _ in range(max(huecos, 0)):
+            self._cerrar(st, 0)
+        st[0], st[1], st[5] = periodo, 0, False
+
+    # -------------------------------
+    # Ingesta de filas nuevas
+    # -------------------------------
+    def _filas(self, df):
+        columnas = [self.col_fecha, self.col_blanco] + self.dimensiones
+        columnas = [c for c in dict.fromkeys(columnas) if c in df.columns]
+
+        filas = df[columnas].reset_index(drop=True)
+        filas[self.col_fecha] = pd.to_datetime(
+            filas[self.col_fecha], errors='coerce'
+        )
+        return filas
+
+    def _huellas(self, filas):
+        # vacíos (None / NaN / NaT) se escriben igual antes de hashear
+        texto = filas.astype(object).where(filas.notna(), None).astype(str)
+        return pd.util.hash_pandas_object(texto, index=False).map(
+            '{:016x}'.format
+        )
+
+    def nuevas_filas(self, df):
+        filas = self._filas(df)
+        fechas = filas[self.col_fecha]
+        dias = fechas.dt.strftime('%Y-%m-%d')
+        huellas = self._huellas(filas)
+
+        # n-ésima aparición de la misma fila en el mismo día
+        aparicion = huellas.groupby([dias, huellas], dropna=False).cumcount()
+        ingeridas = pd.Series([
+            self.huellas_por_dia.get(dia, {}).get(huella, 0)
+            for dia, huella in zip(dias, huellas)
+        ], index=filas.index)
+
+        nuevas = fechas.notna() & (aparicion >= ingeridas)
+        if self._ingerido_hasta is not None:
+            nuevas &= fechas > self._ingerido_hasta
+        return df[nuevas.to_numpy()]
+
+    def ingerir(self, df):
+        filas = self._filas(df)
+        filas = filas[filas[self.col_fecha].notna()].sort_values(
+            self.col_fecha, kind='stable'
+        )
+        huellas = self._huellas(filas).tolist()
+        filas = filas.astype(object).where(filas.notna(), None)
+
+        alertas = []
+        for fila, huella in zip(filas.to_dict('records'), huellas):
+            fecha = fila[self.col_fecha]
+            periodo = periodo_semana(fecha)
+
+            for llave in self._llaves(fila):
+                st = self.estado.get(llave)
+                if st is None:
+                    st = self.estado[llave] = [periodo, 0, None, 0.0, 0.0, False]
+                elif periodo > st[0]:
+                    self._avanzar(llave, st, periodo, alertas)
+                elif periodo < st[0]:
+                    # fila atrasada de un periodo ya cerrado: se ignora
+                    continue
+
+                st[1] += 1
+                ewma, var = st[2], st[3]
+                if ewma is None or st[5] or st[1] < MIN_CONTEO:
+                    continue
+                umbral = ewma + self.z_pico * math.sqrt(max(var, 1.0))
+                if st[1] > umbral:
+                    st[5] = True
+                    alertas.append({
+                        'llave': llave, 'periodo': periodo, 'conteo': st[1],
+                        'esperado': round(ewma, 2), 'tipo': 'PICO'
+                    })
+
+            dia = self.huellas_por_dia.setdefault(fecha.strftime('%Y-%m-%d'), {})
+            dia[huella] = dia.get(huella, 0) + 1
+            if self.ultima_fecha is None or fecha > self.ultima_fecha:
+                self.ultima_fecha = fecha
+
+        return self._tabla_alertas(alertas)
+
+    def _tabla_alertas(self, alertas):
+        tabla = pd.DataFrame(
+            alertas,
+            columns=['llave', 'periodo', 'conteo', 'esperado', 'tipo']
+        )
+        partes = tabla['llave'].str.split('|', expand=True)
+        tabla['dimension'] = partes[0] if len(tabla) else None
+        tabla['valor'] = partes[1] if len(tabla) else None
+        tabla['blanco'] = (
+            partes[2] if len(tabla) and partes.shape[1] > 2 else None
+        )
+        return tabla.drop(columns='llave')
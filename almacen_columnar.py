@@ -0,0 +1,129 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# ALMACÉN COLUMNAR MAPEADO EN MEMORIA
+# ===============================
+# Cada columna del df limpio se guarda como un .npy:
+#   texto   -> códigos enteros + diccionario (JSON)
+#   números -> float64
+#   fechas  -> datetime64[ns]
+# Los procesos lo abren con np.load(mmap_mode='r'): no se copia ni se
+# serializa nada, el sistema operativo comparte una sola copia física.
+
+ARCHIVO_META = 'meta.json'
+
+
+def _tipo_columna(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return 'fecha'
+    if pd.api.types.is_bool_dtype(serie):
+        return 'numero'
+    if pd.api.types.is_numeric_dtype(serie):
+        return 'numero'
+    return 'categoria'
+
+
+def _dtype_codigos(n_categorias):
+    if n_categorias < 2 ** 7:
+        return 'int8'
+    if n_categorias < 2 ** 15:
+        return 'int16'
+    return 'int32'
+
+
+def guardar_almacen(df, ruta, columnas=None):
+    os.makedirs(ruta, exist_ok=True)
+    columnas = list(columnas or df.columns)
+
+    meta = {'filas': len(df), 'columnas': {}, 'diccionarios': {}}
+
+    for col in columnas:
+        serie = df[col]
+        tipo = _tipo_columna(serie)
+        archivo = os.path.join(ruta, f'{col}.npy')
+
+        if tipo == 'categoria':
+            # las categorías se guardan como texto para que el JSON sea estable
+            serie = serie.astype(str).where(serie.notna()).astype('category')
+            categorias = serie.cat.categories.tolist()
+            codigos = serie.cat.codes.to_numpy().astype(
+                _dtype_codigos(len(categorias))
+            )
+            np.save(archivo, codigos)
+            meta['diccionarios'][col] = categorias
+        elif tipo == 'fecha':
+            np.save(archivo, serie.to_numpy(dtype='datetime64[ns]'))
+        elif pd.api.types.is_integer_dtype(serie.dtype) and serie.dtype != object:
+            np.save(archivo, serie.to_numpy())
+        else:
+            np.save(archivo, serie.to_numpy(dtype='float64', na_value=np.nan))
+
+        meta['columnas'][col] = tipo
+
+    with open(os.path.join(ruta, ARCHIVO_META), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+class AlmacenColumnar:
+
+    def __init__(self, ruta, mmap=True):
+        self.ruta = ruta
+        self.modo = 'r' if mmap else None
+        with open(os.path.join(ruta, ARCHIVO_META), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.filas = meta['filas']
+        self.tipos = meta['columnas']
+        self.diccionarios = meta['diccionarios']
+        self._arreglos = {}
+        self._indices = {}
+
+    @property
+    def columnas(self):
+        return list(self.tipos)
+
+    # -------------------------------
+    # Acceso sin copia
+    # -------------------------------
+    def arreglo(self, col):
+        if col not in self._arreglos:
+            self._arreglos[col] = np.load(
+                os.path.join(self.ruta, f'{col}.npy'),
+                mmap_mode=self.modo
+            )
+        return self._arreglos[col]
+
+    def codigos(self, col):
+        return self.arreglo(col)
+
+    def codigo(self, col, valor):
+        if col not in self._indices:
+            self._indices[col] = {
+                v: i for i, v in enumerate(self.diccionarios[col])
+            }
+        return self._indices[col].get(valor, -1)
+
+    def columna(self, col, filas=None):
+        arreglo = self.arreglo(col)
+        if filas is not None:
+            arreglo = arreglo[filas]
+        if self.tipos[col] == 'categoria':
+            return pd.Series(
+                pd.Categorical.from_codes(arreglo, self.diccionarios[col]),
+                name=col
+            )
+        return pd.Series(arreglo, name=col, copy=False)
+
+    # -------------------------------
+    # DataFrame con solo las columnas (y filas) pedidas
+    # -------------------------------
+    def frame(self, columnas=None, filas=None):
+        columnas = columnas or self.columnas
+        return pd.DataFrame({col: self.columna(col, filas) for col in columnas})
+
+
+def abrir_almacen(ruta, mmap=True):
+    return AlmacenColumnar(ruta, mmap=mmap)
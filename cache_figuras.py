@@ -0,0 +1,178 @@
+import hashlib
+import inspect
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# ===============================
+# CACHE DE FIGURAS DIRECCIONADA POR CONTENIDO
+# ===============================
+# llave = hash(nombre + tabla agregada + código de la gráfica + estilo)
+# Si la llave ya existe se sirve el archivo renderizado (HTML para plotly,
+# PNG para matplotlib) y no se vuelve a construir ni renderizar la figura.
+# La cache está acotada en número de entradas y en bytes; al llenarse se
+# expulsan las menos usadas recientemente (LRU).
+
+CARPETA_CACHE = ".cache_figuras"
+ARCHIVO_INDICE = "indice.json"
+
+# los reportes por entidad dejan ~3 figuras por cliente / predio
+MAX_ENTRADAS = 2000
+MAX_BYTES = 200 * 1024 * 1024
+
+# parámetros de matplotlib que cambian el aspecto de las figuras
+PREFIJOS_RC = ('font.', 'axes.', 'xtick.', 'ytick.', 'legend.', 'figure.',
+               'grid.', 'lines.')
+
+
+# -------------------------------
+# Huella de los insumos
+# -------------------------------
+def _bytes_de(valor):
+    if isinstance(valor, pd.Series):
+        valor = valor.to_frame()
+    if isinstance(valor, pd.DataFrame):
+        return (
+            repr(list(valor.columns)).encode()
+            + repr(list(valor.dtypes.astype(str))).encode()
+            + pd.util.hash_pandas_object(valor, index=True).values.tobytes()
+        )
+    if callable(valor):
+        try:
+            return inspect.getsource(valor).encode()
+        except (OSError, TypeError):
+            codigo = valor.__code__
+            return codigo.co_code + repr(codigo.co_consts).encode()
+    if isinstance(valor, dict):
+        return json.dumps(
+            {str(k): v for k, v in valor.items()},
+            sort_keys=True, default=repr
+        ).encode()
+    return repr(valor).encode()
+
+
+def huella(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(_bytes_de(parte))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def rc_relevantes(rc):
+    return {
+        k: v for k, v in rc.items()
+        if k.startswith(PREFIJOS_RC)
+    }
+
+
+# -------------------------------
+# Render de la figura a bytes
+# -------------------------------
+def renderizar(fig):
+    if hasattr(fig, 'to_html'):
+        return fig.to_html(include_plotlyjs='cdn').encode('utf-8'), '.html'
+
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue(), '.png'
+
+
+# ===============================
+# CACHE LRU EN DISCO
+# ===============================
+class CacheFiguras:
+
+    def __init__(self, carpeta=CARPETA_CACHE, max_entradas=MAX_ENTRADAS,
+                 max_bytes=MAX_BYTES):
+        self.carpeta = carpeta
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+        os.makedirs(carpeta, exist_ok=True)
+        self.indice = OrderedDict()
+        ruta = os.path.join(carpeta, ARCHIVO_INDICE)
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                self.indice = OrderedDict(json.load(f))
+
+    def _ruta(self, archivo):
+        return os.path.join(self.carpeta, archivo)
+
+    def _guardar_indice(self):
+        # escritura atómica: otros procesos pueden estar leyendo el índice
+        temporal = self._ruta(ARCHIVO_INDICE + f'.{os.getpid()}')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(list(self.indice.items()), f)
+        os.replace(temporal, self._ruta(ARCHIVO_INDICE))
+
+    def obtener(self, llave):
+        with self._candado:
+            entrada = self.indice.get(llave)
+            if entrada is None or not os.path.exists(self._ruta(entrada['archivo'])):
+                self.indice.pop(llave, None)
+                self.fallos += 1
+                return None
+            self.indice.move_to_end(llave)
+            self.aciertos += 1
+            self._guardar_indice()
+            return self._ruta(entrada['archivo'])
+
+    def guardar(self, llave, contenido, extension):
+        archivo = self.escribir(llave, contenido, extension)
+        self.registrar(llave, archivo, len(contenido))
+        return self._ruta(archivo)
+
+    # -------------------------------
+    # Uso desde procesos trabajadores
+    # -------------------------------
+    # Los trabajadores solo leen y escriben archivos de figura (la llave es
+    # el contenido, dos procesos escriben lo mismo); el índice lo actualiza
+    # únicamente el proceso principal con registrar().
+    def buscar(self, llave):
+        for extension in ('.html', '.png'):
+            if os.path.exists(self._ruta(llave + extension)):
+                return llave + extension
+        return None
+
+    def escribir(self, llave, contenido, extension):
+        archivo = llave + extension
+        temporal = self._ruta(archivo + f'.{os.getpid()}')
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+        os.replace(temporal, self._ruta(archivo))
+        return archivo
+
+    def registrar(self, llave, archivo, tamano=None):
+        if tamano is None:
+            try:
+                tamano = os.path.getsize(self._ruta(archivo))
+            except FileNotFoundError:
+                return
+        with self._candado:
+            self.indice[llave] = {'archivo': archivo, 'bytes': tamano}
+            self.indice.move_to_end(llave)
+            self._expulsar()
+            self._guardar_indice()
+
+    def _expulsar(self):
+        total = sum(e['bytes'] for e in self.indice.values())
+        while self.indice and (
+            len(self.indice) > self.max_entradas or total > self.max_bytes
+        ):
+            _, entrada = self.indice.popitem(last=False)
+            total -= entrada['bytes']
+            try:
+                os.remove(self._ruta(entrada['archivo']))
+            except FileNotFoundError:
+                pass
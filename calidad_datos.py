@@ -0,0 +1,119 @@
+import pandas as pd
+
+# ===============================
+# PERFIL DE CALIDAD DE DATOS
+# ===============================
+# Se alimenta durante la misma limpieza del script: en lugar de llamar
+# pd.to_numeric / pd.to_datetime / filtros directamente, se llaman los
+# métodos del perfil, que devuelven el mismo resultado y de paso cuentan
+# (en forma vectorizada) lo que se perdió:
+#   nulos y distintos por columna (al cargar)
+#   números y fechas que no se pudieron convertir (quedan NaN / NaT)
+#   valores que la normalización manda a la categoría "sin mapear"
+#   filas descartadas por cada filtro
+
+VACIO = '(vacío)'
+EJEMPLOS = 5
+
+COLUMNAS_REPORTE = [
+    'filas', 'nulos', 'nulos_%', 'distintos',
+    'numeros_forzados', 'fechas_forzadas', 'sin_mapear'
+]
+
+
+class PerfilCalidad:
+
+    def __init__(self, df):
+        self.filas = len(df)
+        self.nulos = df.isna().sum()
+        self.distintos = df.nunique(dropna=True)
+        self.forzados = {'numeros_forzados': {}, 'fechas_forzadas': {}}
+        self.sin_mapear_conteo = {}
+        self.ejemplos = {}
+        self.descartadas = {}
+
+    # -------------------------------
+    # Conversiones con conteo de forzados
+    # -------------------------------
+    def _registrar_forzados(self, tipo, original, convertida):
+        if not isinstance(original, pd.Series):
+            return
+        mascara = original.notna() & convertida.isna()
+        self.forzados[tipo][original.name] = int(mascara.sum())
+        if mascara.any():
+            self.ejemplos[(tipo, original.name)] = (
+                original[mascara].astype(str).value_counts().head(EJEMPLOS)
+            )
+
+    def a_numero(self, serie):
+        convertida = pd.to_numeric(serie, errors='coerce')
+        self._registrar_forzados('numeros_forzados', serie, convertida)
+        return convertida
+
+    def a_fecha(self, serie, **kwargs):
+        convertida = pd.to_datetime(serie, errors='coerce', **kwargs)
+        self._registrar_forzados('fechas_forzadas', serie, convertida)
+        return convertida
+
+    # -------------------------------
+    # Normalizaciones y filtros
+    # -------------------------------
+    def sin_mapear(self, original, normalizada, etiqueta):
+        mascara = normalizada == etiqueta
+        self.sin_mapear_conteo[original.name] = int(mascara.sum())
+        if mascara.any():
+            self.ejemplos[('sin_mapear', original.name)] = (
+                original[mascara].fillna(VACIO).astype(str)
+                .value_counts().head(EJEMPLOS)
+            )
+
+    def filtrar(self, df, mascara, motivo):
+        # mismo resultado que df[mascara], contando las filas quitadas
+        self.descartadas[motivo] = (
+            self.descartadas.get(motivo, 0) + int((~mascara).sum())
+        )
+        return df[mascara]
+
+    # -------------------------------
+    # Reporte compacto
+    # -------------------------------
+    def reporte(self):
+        tabla = pd.DataFrame({
+            'nulos': self.nulos,
+            'distintos': self.distintos
+        })
+        tabla.insert(0, 'filas', self.filas)
+        tabla['nulos_%'] = (
+            tabla['nulos'] / self.filas * 100 if self.filas else 0.0
+        ).round(1)
+        for tipo, conteos in self.forzados.items():
+            tabla[tipo] = pd.Series(conteos, dtype='int64')
+        tabla['sin_mapear'] = pd.Series(self.sin_mapear_conteo, dtype='int64')
+        tabla = tabla[COLUMNAS_REPORTE]
+        tabla[COLUMNAS_REPORTE[4:]] = tabla[COLUMNAS_REPORTE[4:]].fillna(0)
+        return (
+            tabla.astype({c: 'int64' for c in COLUMNAS_REPORTE[4:]})
+            .rename_axis('columna')
+        )
+
+    def imprimir(self, titulo=''):
+        tabla = self.reporte()
+        problemas = tabla[
+            (tabla['nulos'] > 0)
+            | (tabla[COLUMNAS_REPORTE[4:]].sum(axis=1) > 0)
+        ]
+
+        print(f"\n🩺 CALIDAD DE DATOS {titulo}".rstrip())
+        print(f"Filas cargadas: {self.filas:,}")
+        if problemas.empty:
+            print("✅ Sin nulos ni valores forzados")
+        else:
+            print(problemas.drop(columns='filas').to_string())
+        print(f"✅ {len(tabla) - len(problemas)} columnas sin problemas")
+
+        for (tipo, col), ejemplos in self.ejemplos.items():
+            print(f"⚠️ {col} – {tipo}: "
+                  + ", ".join(f"{v} ({n})" for v, n in ejemplos.items()))
+        for motivo, n in self.descartadas.items():
+            if n:
+                print(f"🗑️ Filas descartadas por {motivo}: {n:,}")
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pandas as pd
+
+# ===============================
+# CARGA DE HOJAS CON CACHE EN PROCESO
+# ===============================
+# Cada hoja se lee una sola vez sin encabezado; el encabezado se detecta y
+# se aplica sobre esa misma lectura (antes se leía el libro dos veces).
+# La cache permite que el ejecutor por lotes precargue los libros en
+# hilos mientras se importan las librerías de gráficas.
+
+_cache = {}
+_candados = {}
+_candado_global = threading.Lock()
+
+
+def _llave(archivo, hoja):
+    ruta = os.path.abspath(archivo)
+    return ruta, hoja, os.path.getmtime(ruta)
+
+
+def leer_hoja(archivo, hoja):
+    llave = _llave(archivo, hoja)
+    with _candado_global:
+        candado = _candados.setdefault(llave, threading.Lock())
+
+    # si otro hilo ya está leyendo la misma hoja, se espera su resultado
+    with candado:
+        if llave not in _cache:
+            _cache[llave] = pd.read_excel(archivo, sheet_name=hoja, header=None)
+    return _cache[llave]
+
+
+def detectar_encabezado(raw, requeridos):
+    requeridos = set(requeridos)
+    for i in range(len(raw)):
+        fila = set(raw.iloc[i].astype(str).str.upper())
+        if requeridos <= fila:
+            return i
+    return None
+
+
+def nombres_encabezado(valores):
+    nombres = []
+    vistos = {}
+    for i, valor in enumerate(valores):
+        nombre = f"Unnamed: {i}" if pd.isna(valor) else str(valor)
+        # mismo criterio que pandas para encabezados repetidos
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
+
+
+def tipar_columnas(df):
+    # quitar filas totalmente vacías, como hace read_excel
+    df = df.dropna(how='all').reset_index(drop=True).infer_objects()
+
+    # columnas numéricas con vacíos o texto numérico quedan como object:
+    # convertirlas como lo hace read_excel al parsear con encabezado
+    for col in df.columns[df.dtypes == object]:
+        try:
+            df[col] = pd.to_numeric(df[col])
+        except (ValueError, TypeError):
+            pass
+    return df
+
+
+def aplicar_encabezado(raw, header_row):
+    df = raw.iloc[header_row + 1:].reset_index(drop=True)
+    df.columns = nombres_encabezado(raw.iloc[header_row])
+    return tipar_columnas(df)
+
+
+def cargar_hoja(archivo, hoja, requeridos):
+    raw = leer_hoja(archivo, hoja)
+    header_row = detectar_encabezado(raw, requeridos)
+    if header_row is None:
+        raise ValueError("❌ No se encontró la fila de encabezados")
+    print(f"✅ Encabezados encontrados en la fila {header_row}")
+    return aplicar_encabezado(raw, header_row)
@@ -0,0 +1,100 @@
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from carga import leer_hoja
+
+# ===============================
+# EJECUCIÓN POR LOTES: SALIDA + DESTINO EN UN SOLO PROCESO
+# ===============================
+# 1. Los dos libros se leen en hilos mientras se importan pandas/plotly/
+#    seaborn en el hilo principal (la lectura queda en la cache de carga).
+# 2. Ambos scripts corren en este mismo proceso, compartiendo un pool de
+#    renderizado para las gráficas plotly.
+# 3. El libro de KPI se escribe una sola vez al final.
+# Con --preview cada script muestrea su libro en streaming (no se precarga)
+# y termina con sys.exit() después de las estimaciones; no hay libro KPI.
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+
+REPORTES = [
+    ('Salida', 'main.py', 'DatosSalida.xlsx', 'BASE PUERTO SALIDA'),
+    ('Destino', 'mainDestino.py', 'DatosDestino.xlsx', 'Base Interc.')
+]
+
+
+def _cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    funcion(*args)
+    return time.perf_counter() - inicio
+
+
+def _ejecutar_script(ruta):
+    try:
+        runpy.run_path(ruta, None, '__main__')
+    except SystemExit as fin:
+        # la vista previa termina el script con sys.exit(0)
+        if fin.code not in (None, 0):
+            raise
+
+
+def importar_librerias():
+    import plotly.express  # noqa: F401
+    import seaborn  # noqa: F401
+    import matplotlib.pyplot  # noqa: F401
+
+
+def main():
+    tiempos = {}
+    inicio = time.perf_counter()
+    vista_previa = '--preview' in sys.argv
+
+    with ThreadPoolExecutor(max_workers=len(REPORTES)) as lectores:
+        lecturas = {
+            archivo: lectores.submit(_cronometrar, leer_hoja, archivo, hoja)
+            for _, _, archivo, hoja in REPORTES
+            if not vista_previa
+        }
+        tiempos['importar librerías'] = _cronometrar(importar_librerias)
+        for archivo, futuro in lecturas.items():
+            tiempos[f'leer {archivo}'] = futuro.result()
+    tiempos['carga (en paralelo)'] = time.perf_counter() - inicio
+
+    import renderizado
+    import exportar_kpi
+
+    renderizado.iniciar_pool()
+    exportar_kpi.diferir_exportacion()
+    try:
+        for nombre, script, _, _ in REPORTES:
+            tiempos[f'reporte {nombre}'] = _cronometrar(
+                _ejecutar_script,
+                os.path.join(CARPETA, script)
+            )
+
+        tiempos['renderizado pendiente'] = _cronometrar(renderizado.esperar)
+        if not vista_previa:
+            tiempos['libro KPI'] = _cronometrar(
+                exportar_kpi.exportar_libro,
+                exportar_kpi.ARCHIVO_KPI,
+                exportar_kpi.CARPETA_TABLAS,
+                True
+            )
+    finally:
+        renderizado.cerrar_pool()
+        exportar_kpi.diferir_exportacion(False)
+
+    tiempos['TOTAL'] = time.perf_counter() - inicio
+
+    if not vista_previa:
+        print(f"\n📁 KPI exportados a {exportar_kpi.ARCHIVO_KPI}")
+    print("\n⏱️ RESUMEN DE TIEMPOS")
+    for etapa, segundos in tiempos.items():
+        print(f"{etapa:<32}{segundos:>8.2f} s")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, CARPETA)
+    main()
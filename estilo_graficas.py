@@ -0,0 +1,63 @@
+# ===============================
+# ESTILO Y PALETAS COMPARTIDAS DE LAS GRÁFICAS
+# ===============================
+# Lo usan main.py, mainDestino.py y los reportes por entidad, para que
+# las gráficas de cada cliente / predio salgan con el mismo estilo y los
+# mismos colores por blanco que los reportes generales.
+
+PALETA_MORADO = {
+    'Trips': '#6A0DAD',     # morado fuerte
+    'Afidos': '#B19CD9'     # morado claro
+}
+PALETA_MORADO3 = [
+    '#6A0DAD',  # morado fuerte
+    '#B19CD9' ]   # morado claro
+
+ORDEN_BLANCOS = ["Trips", "Afidos"]
+
+PALETA_DESTINO = [
+    '#6A0DAD', '#B19CD9', '#9B59B6',
+    '#D7BDE2', '#BB8FCE', '#7D3C98'
+]
+
+
+# ===============================
+# FUNCIÓN ESTÁNDAR DE ESTILO PLOTLY
+# ===============================
+def estilo_grafica(fig, mostrar_leyenda=True):
+    fig.update_layout(
+        font=dict(size=40),
+        title=dict(font=dict(size=56)),
+        xaxis=dict(
+            title_font=dict(size=44),
+            tickfont=dict(size=36)
+        ),
+        yaxis=dict(
+            title_font=dict(size=44),
+            tickfont=dict(size=36)
+        ),
+        legend=dict(font=dict(size=36)),
+        bargap=0.3,
+        plot_bgcolor='white'
+    )
+
+    fig.update_traces(
+        textfont_size=18
+    )
+
+    fig.update_layout(showlegend=mostrar_leyenda)
+
+    return fig
+
+
+# -------------------------------
+# Colores fijos por blanco
+# -------------------------------
+def mapa_colores(blancos, base=None, secuencia=PALETA_DESTINO):
+    # los blancos de 'base' conservan su color; el resto toma la secuencia
+    # en orden alfabético, así el color no depende del orden de aparición
+    mapa = dict(base or {})
+    resto = sorted(b for b in set(blancos) if b not in mapa)
+    for i, blanco in enumerate(resto, start=len(mapa)):
+        mapa[blanco] = secuencia[i % len(secuencia)]
+    return mapa
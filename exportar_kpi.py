@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from almacen_columnar import abrir_almacen, guardar_almacen
+
+# ===============================
+# EXPORTACIÓN DE KPI A UN LIBRO MULTI-HOJA
+# ===============================
+# Cada reporte registra sus tablas KPI en CARPETA_TABLAS (almacén
+# columnar). exportar_libro() arma un solo libro con las tablas de todos
+# los reportes usando xlsxwriter en modo constant_memory: las filas se
+# escriben por bloques y en orden, así que la memoria no crece con el
+# tamaño de las hojas de detalle.
+
+CARPETA_TABLAS = "kpi_tablas"
+ARCHIVO_KPI = "kpi_interceptaciones.xlsx"
+ARCHIVO_ORDEN = "orden.json"
+
+FILAS_BLOQUE = 50_000
+MAX_ANCHO = 50
+
+COLOR_ENCABEZADO = '#6A0DAD'
+
+# las fechas se escriben como número de serie de Excel (más rápido que
+# convertir celda por celda); el formato de la columna las muestra como fecha
+EPOCA_EXCEL = pd.Timestamp('1899-12-30')
+
+FORMATOS = {
+    'entero': '#,##0',
+    'decimal': '#,##0.00',
+    'porcentaje': '0.00"%"',
+    'fecha': 'yyyy-mm-dd'
+}
+
+# columnas con escala de color (semáforo) y con barras de datos
+PALABRAS_SEMAFORO = ('%', 'tasa', 'indice')
+PALABRAS_BARRAS = ('interceptaciones', 'tallos', 'eventos', 'registros')
+
+
+# -------------------------------
+# Registro de tablas por reporte
+# -------------------------------
+def _plana(tabla):
+    if isinstance(tabla, pd.Series):
+        tabla = tabla.to_frame()
+    # índices con nombre son columnas del KPI; los anónimos se descartan
+    tabla = tabla.reset_index(drop=all(n is None for n in tabla.index.names))
+    tabla.columns = [str(c) for c in tabla.columns]
+    return tabla
+
+
+def registrar_tablas(reporte, tablas, carpeta=CARPETA_TABLAS):
+    destino = os.path.join(carpeta, reporte)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.makedirs(destino)
+
+    for nombre, tabla in tablas.items():
+        guardar_almacen(_plana(tabla), os.path.join(destino, nombre))
+
+    with open(os.path.join(destino, ARCHIVO_ORDEN), 'w', encoding='utf-8') as f:
+        json.dump(list(tablas), f, ensure_ascii=False)
+
+
+def tablas_registradas(carpeta=CARPETA_TABLAS):
+    if not os.path.isdir(carpeta):
+        return
+    for reporte in sorted(os.listdir(carpeta)):
+        ruta_orden = os.path.join(carpeta, reporte, ARCHIVO_ORDEN)
+        if not os.path.exists(ruta_orden):
+            continue
+        with open(ruta_orden, encoding='utf-8') as f:
+            orden = json.load(f)
+        for nombre in orden:
+            yield reporte, nombre, abrir_almacen(
+                os.path.join(carpeta, reporte, nombre)
+            )
+
+
+# -------------------------------
+# Escritor en memoria constante
+# -------------------------------
+class LibroKPI:
+
+    def __init__(self, ruta=ARCHIVO_KPI):
+        import xlsxwriter
+
+        self.libro = xlsxwriter.Workbook(ruta, {
+            'constant_memory': True,
+            'default_date_format': FORMATOS['fecha']
+        })
+        self.formatos = {
+            k: self.libro.add_format({'num_format': v})
+            for k, v in FORMATOS.items()
+        }
+        self.encabezado = self.libro.add_format({
+            'bold': True,
+            'font_color': 'white',
+            'bg_color': COLOR_ENCABEZADO,
+            'border': 1
+        })
+        self.hojas = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self.libro.close()
+
+    def _nombre_hoja(self, nombre):
+        for c in '[]:*?/\\':
+            nombre = nombre.replace(c, ' ')
+        base = nombre[:31]
+        nombre, i = base, 2
+        while nombre.lower() in self.hojas:
+            sufijo = f' ({i})'
+            nombre = base[:31 - len(sufijo)] + sufijo
+            i += 1
+        self.hojas.add(nombre.lower())
+        return nombre
+
+    def _formato_columna(self, nombre, dtype):
+        if '%' in nombre:
+            return self.formatos['porcentaje']
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return self.formatos['fecha']
+        if pd.api.types.is_integer_dtype(dtype):
+            return self.formatos['entero']
+        if pd.api.types.is_float_dtype(dtype):
+            return self.formatos['decimal']
+        return None
+
+    def agregar_hoja(self, nombre, tabla):
+        hoja = self.libro.add_worksheet(self._nombre_hoja(nombre))
+
+        if isinstance(tabla, pd.DataFrame):
+            tabla = _plana(tabla)
+            columnas = list(tabla.columns)
+            filas = len(tabla)
+            bloques = (
+                tabla.iloc[i:i + FILAS_BLOQUE].copy()
+                for i in range(0, filas, FILAS_BLOQUE)
+            )
+        else:
+            # almacén columnar: se leen solo las filas de cada bloque
+            columnas = tabla.columnas
+            filas = tabla.filas
+            bloques = (
+                tabla.frame(filas=slice(i, i + FILAS_BLOQUE))
+                for i in range(0, filas, FILAS_BLOQUE)
+            )
+
+        fila = 0
+        for bloque in bloques:
+            if fila == 0:
+                self._preparar_hoja(hoja, bloque, columnas)
+                fila = 1
+            for col in bloque.columns:
+                if pd.api.types.is_datetime64_any_dtype(bloque[col]):
+                    bloque[col] = (bloque[col] - EPOCA_EXCEL) / pd.Timedelta(days=1)
+            valores = bloque.astype(object).where(bloque.notna(), None)
+            for registro in valores.itertuples(index=False, name=None):
+                hoja.write_row(fila, 0, registro)
+                fila += 1
+
+        if fila == 0:
+            hoja.write_row(0, 0, columnas, self.encabezado)
+            return hoja
+
+        self._formato_condicional(hoja, columnas, filas)
+        return hoja
+
+    def _preparar_hoja(self, hoja, muestra, columnas):
+        for c, col in enumerate(columnas):
+            largo = muestra[col].head(200).astype(str).str.len().max()
+            largo = int(largo) if pd.notna(largo) else 0
+            ancho = min(max(len(col), largo) + 2, MAX_ANCHO)
+            hoja.set_column(
+                c, c, ancho, self._formato_columna(col, muestra[col].dtype)
+            )
+        hoja.write_row(0, 0, columnas, self.encabezado)
+        hoja.freeze_panes(1, 0)
+
+    def _formato_condicional(self, hoja, columnas, filas):
+        hoja.autofilter(0, 0, filas, len(columnas) - 1)
+        for c, col in enumerate(columnas):
+            nombre = col.lower()
+            if any(p in nombre for p in PALABRAS_SEMAFORO):
+                hoja.conditional_format(1, c, filas, c, {
+                    'type': '3_color_scale',
+                    'min_color': '#63BE7B',
+                    'mid_color': '#FFEB84',
+                    'max_color': '#F8696B'
+                })
+            elif any(p in nombre for p in PALABRAS_BARRAS):
+                hoja.conditional_format(1, c, filas, c, {
+                    'type': 'data_bar',
+                    'bar_color': '#B19CD9'
+                })
+
+
+# ===============================
+# LIBRO CONSOLIDADO DE TODOS LOS REPORTES
+# ===============================
+# El ejecutor por lotes difiere la exportación para escribir el libro una
+# sola vez, después de que ambos reportes registraron sus tablas.
+_exportacion_diferida = False
+
+
+def diferir_exportacion(diferir=True):
+    global _exportacion_diferida
+    _exportacion_diferida = diferir
+
+
+def exportar_libro(ruta=ARCHIVO_KPI, carpeta=CARPETA_TABLAS, forzar=False):
+    if _exportacion_diferida and not forzar:
+        return None
+    with LibroKPI(ruta) as libro:
+        for reporte, nombre, almacen in tablas_registradas(carpeta):
+            libro.agregar_hoja(f'{reporte} {nombre}', almacen)
+    return ruta
@@ -0,0 +1,289 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# ÍNDICES DE MAPAS DE BITS (ESTILO ROARING)
+# ===============================
+# Por cada valor de las columnas de filtro se guarda el conjunto de filas
+# donde aparece. Las filas se parten en contenedores de 65.536 y cada
+# contenedor se guarda como:
+#   arreglo -> filas ordenadas (uint16) si son pocas (<= 4096)
+#   bitmap  -> 1024 palabras uint64 si son muchas
+# Los filtros se resuelven con AND entre columnas y OR entre valores de
+# una misma columna, contenedor por contenedor, sin tocar el DataFrame.
+# Los índices se construyen desde el almacén columnar (códigos) y se
+# guardan en una subcarpeta del almacén.
+
+CARPETA_INDICES = 'indices'
+ARCHIVO_META = 'meta.json'
+
+BITS_CONTENEDOR = 16
+TAMANO_CONTENEDOR = 1 << BITS_CONTENEDOR
+PALABRAS_BITMAP = TAMANO_CONTENEDOR // 64
+LIMITE_ARREGLO = 4096
+
+COLUMNAS_INDICE = [
+    'ano', 'blanco_norm', 'pais', 'puerto_destino',
+    'predio', 'cliente', 'producto_norm'
+]
+
+# filas de la tabla de contenedores: valor, clave, tipo, posición
+TIPO_ARREGLO = 0
+TIPO_BITMAP = 1
+
+
+# -------------------------------
+# Operaciones entre contenedores
+# -------------------------------
+def _es_bitmap(contenedor):
+    return contenedor.dtype == np.uint64
+
+
+def _a_bitmap(arreglo):
+    bits = np.zeros(TAMANO_CONTENEDOR, dtype=bool)
+    bits[arreglo] = True
+    return np.packbits(bits, bitorder='little').view(np.uint64)
+
+
+def _a_arreglo(bitmap):
+    bits = np.unpackbits(bitmap.view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _cardinalidad(contenedor):
+    if _es_bitmap(contenedor):
+        return int(np.bitwise_count(contenedor).sum())
+    return len(contenedor)
+
+
+def _compactar(bitmap):
+    if _cardinalidad(bitmap) <= LIMITE_ARREGLO:
+        return _a_arreglo(bitmap)
+    return bitmap
+
+
+def _y(a, b):
+    if not _es_bitmap(a) and not _es_bitmap(b):
+        return np.intersect1d(a, b, assume_unique=True)
+    if not _es_bitmap(a):
+        a, b = b, a
+    if not _es_bitmap(b):
+        # bitmap AND arreglo: se consulta el bit de cada fila del arreglo
+        palabras = a[b >> 6]
+        bits = (palabras >> (b & 63).astype(np.uint64)) & np.uint64(1)
+        return b[bits.astype(bool)]
+    return _compactar(a & b)
+
+
+def _o(a, b):
+    if not _es_bitmap(a) and not _es_bitmap(b):
+        union = np.sort(np.concatenate([a, b]))
+        union = union[np.concatenate([[True], union[1:] != union[:-1]])]
+        return union if len(union) <= LIMITE_ARREGLO else _a_bitmap(union)
+    if not _es_bitmap(a):
+        a = _a_bitmap(a)
+    if not _es_bitmap(b):
+        b = _a_bitmap(b)
+    return a | b
+
+
+# ===============================
+# CONJUNTO DE FILAS COMPRIMIDO
+# ===============================
+class MapaBits:
+
+    def __init__(self, contenedores=None):
+        # clave (fila >> 16) -> contenedor
+        self.contenedores = contenedores or {}
+
+    @classmethod
+    def desde_filas(cls, filas):
+        filas = np.asarray(filas, dtype=np.int64)
+        if np.any(filas[1:] <= filas[:-1]):
+            filas = np.unique(filas)
+        claves = filas >> BITS_CONTENEDOR
+        cortes = np.flatnonzero(np.diff(claves)) + 1
+        contenedores = {}
+        for parte in np.split(filas, cortes):
+            if len(parte) == 0:
+                continue
+            bajos = (parte & (TAMANO_CONTENEDOR - 1)).astype(np.uint16)
+            contenedores[int(parte[0] >> BITS_CONTENEDOR)] = (
+                bajos if len(bajos) <= LIMITE_ARREGLO else _a_bitmap(bajos)
+            )
+        return cls(contenedores)
+
+    def __and__(self, otro):
+        resultado = {}
+        for clave in self.contenedores.keys() & otro.contenedores.keys():
+            contenedor = _y(self.contenedores[clave], otro.contenedores[clave])
+            if _cardinalidad(contenedor):
+                resultado[clave] = contenedor
+        return MapaBits(resultado)
+
+    def __or__(self, otro):
+        resultado = dict(self.contenedores)
+        for clave, contenedor in otro.contenedores.items():
+            propio = resultado.get(clave)
+            resultado[clave] = (
+                contenedor if propio is None else _o(propio, contenedor)
+            )
+        return MapaBits(resultado)
+
+    def __len__(self):
+        return sum(_cardinalidad(c) for c in self.contenedores.values())
+
+    def filas(self):
+        partes = []
+        for clave in sorted(self.contenedores):
+            contenedor = self.contenedores[clave]
+            if _es_bitmap(contenedor):
+                contenedor = _a_arreglo(contenedor)
+            partes.append(
+                contenedor.astype(np.int64) + (clave << BITS_CONTENEDOR)
+            )
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(partes)
+
+
+# ===============================
+# CONSTRUCCIÓN DESDE EL ALMACÉN COLUMNAR
+# ===============================
+def _codigos_y_valores(almacen, col):
+    if almacen.tipos[col] == 'categoria':
+        return np.asarray(almacen.codigos(col)), almacen.diccionarios[col]
+    codigos, valores = pd.factorize(np.asarray(almacen.arreglo(col)), sort=True)
+    return codigos, valores.tolist()
+
+
+def _indexar_columna(codigos, ruta):
+    # filas ordenadas por (valor, fila): cada tramo (valor, clave) es un
+    # contenedor ya ordenado
+    orden = np.argsort(codigos, kind='stable')
+    orden = orden[codigos[orden] >= 0]
+    valores = codigos[orden].astype(np.int64)
+    claves = orden >> BITS_CONTENEDOR
+
+    cambios = np.flatnonzero(
+        (np.diff(valores) != 0) | (np.diff(claves) != 0)
+    ) + 1
+    inicios = np.concatenate([[0], cambios]) if len(orden) else cambios
+    fines = np.concatenate([cambios, [len(orden)]]) if len(orden) else cambios
+
+    tabla, arreglos, bitmaps = [], [], []
+    posicion_arreglo = 0
+    for inicio, fin in zip(inicios, fines):
+        bajos = (orden[inicio:fin] & (TAMANO_CONTENEDOR - 1)).astype(np.uint16)
+        if len(bajos) <= LIMITE_ARREGLO:
+            tabla.append([valores[inicio], claves[inicio], TIPO_ARREGLO,
+                          posicion_arreglo, len(bajos)])
+            arreglos.append(bajos)
+            posicion_arreglo += len(bajos)
+        else:
+            tabla.append([valores[inicio], claves[inicio], TIPO_BITMAP,
+                          len(bitmaps), 0])
+            bitmaps.append(_a_bitmap(bajos))
+
+    os.makedirs(ruta, exist_ok=True)
+    np.save(os.path.join(ruta, 'contenedores.npy'),
+            np.array(tabla, dtype=np.int64).reshape(-1, 5))
+    np.save(os.path.join(ruta, 'arreglos.npy'),
+            np.concatenate(arreglos) if arreglos else np.empty(0, np.uint16))
+    np.save(os.path.join(ruta, 'bitmaps.npy'),
+            np.stack(bitmaps) if bitmaps
+            else np.empty((0, PALABRAS_BITMAP), np.uint64))
+
+
+def construir_indices(almacen, columnas=COLUMNAS_INDICE, ruta=None):
+    ruta = ruta or os.path.join(almacen.ruta, CARPETA_INDICES)
+    meta = {'filas': almacen.filas, 'columnas': {}}
+
+    for col in columnas:
+        if col not in almacen.tipos:
+            continue
+        codigos, valores = _codigos_y_valores(almacen, col)
+        _indexar_columna(codigos, os.path.join(ruta, col))
+        meta['columnas'][col] = valores
+
+    with open(os.path.join(ruta, ARCHIVO_META), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return ruta
+
+
+# ===============================
+# CONSULTA DE FILTROS
+# ===============================
+class IndiceBitmap:
+
+    def __init__(self, ruta, mmap=True):
+        self.ruta = ruta
+        self.modo = 'r' if mmap else None
+        with open(os.path.join(ruta, ARCHIVO_META), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.filas_totales = meta['filas']
+        self.valores = meta['columnas']
+        self._columnas = {}
+
+    @property
+    def columnas(self):
+        return list(self.valores)
+
+    def _columna(self, col):
+        if col not in self._columnas:
+            carpeta = os.path.join(self.ruta, col)
+            cargar = lambda nombre: np.load(
+                os.path.join(carpeta, nombre), mmap_mode=self.modo
+            )
+            tabla = np.asarray(cargar('contenedores.npy'))
+            por_valor = {}
+            for fila in tabla.tolist():
+                por_valor.setdefault(fila[0], []).append(fila[1:])
+            posiciones = {v: i for i, v in enumerate(self.valores[col])}
+            self._columnas[col] = (
+                posiciones, por_valor,
+                cargar('arreglos.npy'), cargar('bitmaps.npy')
+            )
+        return self._columnas[col]
+
+    def mapa(self, col, valor):
+        posiciones, por_valor, arreglos, bitmaps = self._columna(col)
+        contenedores = {}
+        for clave, tipo, posicion, largo in por_valor.get(
+            posiciones.get(valor, -1), []
+        ):
+            if tipo == TIPO_BITMAP:
+                contenedores[clave] = np.asarray(bitmaps[posicion])
+            else:
+                contenedores[clave] = np.asarray(
+                    arreglos[posicion:posicion + largo]
+                )
+        return MapaBits(contenedores)
+
+    def todas(self):
+        return MapaBits.desde_filas(np.arange(self.filas_totales))
+
+    def filtrar(self, **filtros):
+        resultado = None
+        # OR entre valores de una columna, AND entre columnas
+        for col, valores in filtros.items():
+            if not isinstance(valores, (list, tuple, set)):
+                valores = [valores]
+            mapa = MapaBits()
+            for valor in valores:
+                mapa = mapa | self.mapa(col, valor)
+            resultado = mapa if resultado is None else resultado & mapa
+        return self.todas() if resultado is None else resultado
+
+    def contar(self, **filtros):
+        return len(self.filtrar(**filtros))
+
+    def filas(self, **filtros):
+        return self.filtrar(**filtros).filas()
+
+
+def abrir_indices(ruta_almacen, mmap=True):
+    return IndiceBitmap(os.path.join(ruta_almacen, CARPETA_INDICES), mmap=mmap)
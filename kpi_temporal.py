@@ -0,0 +1,173 @@
+import pandas as pd
+
+# ===============================
+# KPI TEMPORALES (SEMANAL / MENSUAL)
+# ===============================
+# Todas las dimensiones se agregan en un solo groupby sobre un formato
+# largo (dimension, valor, periodo); las tablas resultantes quedan en
+# cache para servir cualquier serie sin volver a recorrer los datos.
+
+FRECUENCIAS = {
+    'semanal': 'W-SUN',
+    'mensual': 'MS'
+}
+
+VENTANAS_MOVILES = {
+    'semanal': 4,   # ~ un mes
+    'mensual': 3    # un trimestre
+}
+
+METRICAS = ['interceptaciones', 'tallos_rechazados']
+
+DIMENSION_TOTAL = 'total'
+
+
+class KPITemporal:
+
+    def __init__(self, df, col_fecha, dimensiones, col_tallos=None,
+                 ventanas=None):
+        self.dimensiones = list(dimensiones)
+        self.ventanas = dict(VENTANAS_MOVILES, **(ventanas or {}))
+        self._largo = self._formato_largo(df, col_fecha, col_tallos)
+        self._cache = {}
+
+    # -------------------------------
+    # Formato largo: una fila por (registro, dimensión)
+    # -------------------------------
+    def _formato_largo(self, df, col_fecha, col_tallos):
+        fechas = pd.to_datetime(df[col_fecha], errors='coerce')
+        validas = fechas.notna()
+
+        if col_tallos is not None and col_tallos in df.columns:
+            tallos = pd.to_numeric(df[col_tallos], errors='coerce').fillna(0)
+        else:
+            tallos = pd.Series(0, index=df.index)
+
+        base = pd.DataFrame({
+            'fecha': fechas[validas],
+            'tallos_rechazados': tallos[validas]
+        })
+
+        partes = [base.assign(dimension=DIMENSION_TOTAL, valor='Total')]
+        for dim in self.dimensiones:
+            valores = df.loc[validas, dim]
+            partes.append(
+                base[valores.notna()].assign(
+                    dimension=dim,
+                    valor=valores[valores.notna()].astype(str)
+                )
+            )
+
+        largo = pd.concat(partes, ignore_index=True)
+        largo['dimension'] = largo['dimension'].astype('category')
+        largo['valor'] = largo['valor'].astype('category')
+        return largo
+
+    # -------------------------------
+    # Rollup de una frecuencia (todas las dimensiones a la vez)
+    # -------------------------------
+    def _rollup(self, frecuencia):
+        clave = ('rollup', frecuencia)
+        if clave in self._cache:
+            return self._cache[clave]
+
+        agregado = (
+            self._largo
+            .groupby(
+                ['dimension', 'valor',
+                 pd.Grouper(key='fecha', freq=FRECUENCIAS[frecuencia])],
+                observed=True
+            )
+            .agg(
+                interceptaciones=('fecha', 'size'),
+                tallos_rechazados=('tallos_rechazados', 'sum')
+            )
+        )
+
+        self._cache[clave] = agregado
+        return agregado
+
+    # -------------------------------
+    # Tabla ancha valor x periodo (con cache)
+    # -------------------------------
+    def tabla(self, frecuencia, dimension, metrica='interceptaciones',
+              movil=False):
+        clave = (frecuencia, dimension, metrica, movil)
+        if clave in self._cache:
+            return self._cache[clave]
+
+        if movil:
+            base = self.tabla(frecuencia, dimension, metrica)
+            tabla = (
+                base.T
+                .rolling(self.ventanas[frecuencia], min_periods=1)
+                .mean()
+                .T
+            )
+        else:
+            rollup = self._rollup(frecuencia)
+            if dimension in rollup.index.get_level_values('dimension'):
+                tabla = (
+                    rollup.xs(dimension, level='dimension')[metrica]
+                    .unstack('fecha', fill_value=0)
+                )
+            else:
+                # columna sin valores (o dimensión desconocida): tabla vacía
+                tabla = pd.DataFrame(
+                    index=pd.Index([], name='valor'),
+                    columns=pd.DatetimeIndex([], name='fecha'),
+                    dtype=rollup[metrica].dtype
+                )
+            # periodos continuos para que las ventanas móviles sean correctas
+            if len(tabla.columns):
+                periodos = pd.date_range(
+                    tabla.columns.min(),
+                    tabla.columns.max(),
+                    freq=FRECUENCIAS[frecuencia]
+                )
+                tabla = tabla.reindex(columns=periodos, fill_value=0)
+            tabla.columns.name = 'periodo'
+
+        self._cache[clave] = tabla
+        return tabla
+
+    def precalcular(self):
+        for frecuencia in FRECUENCIAS:
+            for dim in [DIMENSION_TOTAL] + self.dimensiones:
+                for metrica in METRICAS:
+                    self.tabla(frecuencia, dim, metrica)
+                    self.tabla(frecuencia, dim, metrica, movil=True)
+        return self
+
+    # -------------------------------
+    # Serie de tendencia para un valor (p. ej. un predio)
+    # -------------------------------
+    def serie(self, dimension, valor, frecuencia='semanal'):
+        columnas = {}
+        for metrica in METRICAS:
+            for movil in (False, True):
+                tabla = self.tabla(frecuencia, dimension, metrica, movil)
+                nombre = f'{metrica}_movil' if movil else metrica
+                if valor in tabla.index:
+                    columnas[nombre] = tabla.loc[valor]
+                else:
+                    columnas[nombre] = pd.Series(0, index=tabla.columns)
+
+        serie = pd.DataFrame(columnas)
+        serie.index.name = 'periodo'
+        return serie
+
+    def tendencia(self, dimension, valores=None, frecuencia='semanal',
+                  metrica='interceptaciones'):
+        puntual = self.tabla(frecuencia, dimension, metrica)
+        movil = self.tabla(frecuencia, dimension, metrica, movil=True)
+
+        if valores is not None:
+            valores = [v for v in valores if v in puntual.index]
+            puntual = puntual.loc[valores]
+            movil = movil.loc[valores]
+
+        largo = puntual.stack().rename(metrica).to_frame()
+        largo[f'{metrica}_movil'] = movil.stack()
+        largo.index.names = [dimension, 'periodo']
+        return largo.reset_index()
@@ -1,76 +1,65 @@
+import sys
 import pandas as pd
 import plotly.express as px
 import unicodedata
 import seaborn as sns
 import matplotlib.pyplot as plt
+
+from carga import cargar_hoja
+from renderizado import configurar_estilo, mostrar_figura
+from estilo_graficas import (
+    PALETA_MORADO, PALETA_MORADO3, ORDEN_BLANCOS, estilo_grafica
+)
 # ===============================
 # 1. ARCHIVO Y HOJA
 # ===============================
 archivo = "DatosSalida.xlsx"
 hoja = "BASE PUERTO SALIDA"
 
-PALETA_MORADO = {
-    'Trips': '#6A0DAD',     # morado fuerte
-    'Afidos': '#B19CD9'     # morado claro
-}
-PALETA_MORADO3 = [
-    '#6A0DAD',  # morado fuerte
-    '#B19CD9' ]   # morado claro
-
-ORDEN_BLANCOS = ["Trips", "Afidos"]
-
 # ===============================
-
-# 2. CARGAR SIN HEADER
+# 1.1 LIMPIEZA DE TEXTO Y NORMALIZACIÓN DE BLANCOS
 # ===============================
-raw = pd.read_excel(archivo, sheet_name=hoja, header=None)
+# se definen antes de cargar: --preview estratifica por el blanco ya
+# normalizado
+def limpiar_texto(x):
+    if pd.isna(x):
+        return None
+    x = str(x).strip()
+    x = unicodedata.normalize('NFKD', x)
+    x = x.encode('ascii', 'ignore').decode('utf-8')
+    return x.title()
 
-# ===============================
-# 3. DETECTAR FILA DE ENCABEZADOS
-# ===============================
-header_row = None
-for i in range(len(raw)):
-    fila = raw.iloc[i].astype(str).str.upper().tolist()
-    if "PRODUCTO" in fila and "AÑO" in fila:
-        header_row = i
-        break
+def normalizar_blanco(v):
+    if v is None:
+        return "OTROS"
+    v = v.upper()
 
-if header_row is None:
-    raise ValueError("❌ No se encontró la fila de encabezados")
+    if "ACAR" in v: return "Acaros"
+    if "AFID" in v: return "Afidos"
+    if "BABOS" in v: return "Babosa"
+    if "DIPTER" in v or "MOSCA" in v: return "Diptero"
+    if "MINA" in v: return "Minador"
+    if "MOLUS" in v or "CARAC" in v: return "Moluscos"
+    if "TRIP" in v: return "Trips"
 
-print(f"✅ Encabezados encontrados en la fila {header_row}")
+    return "OTROS"
 
 # ===============================
-# 4. RELEER CON HEADER CORRECTO
-# ===============================
-df = pd.read_excel(archivo, sheet_name=hoja, header=header_row)
-# ===============================
-# FUNCIÓN ESTÁNDAR DE ESTILO PLOTLY
+
+# 2-4. CARGAR HOJA Y DETECTAR FILA DE ENCABEZADOS
 # ===============================
-def estilo_grafica(fig, mostrar_leyenda=True):
-    fig.update_layout(
-        font=dict(size=40),
-        title=dict(font=dict(size=56)),
-        xaxis=dict(
-            title_font=dict(size=44),
-            tickfont=dict(size=36)
-        ),
-        yaxis=dict(
-            title_font=dict(size=44),
-            tickfont=dict(size=36)
-        ),
-        legend=dict(font=dict(size=36)),
-        bargap=0.3,
-        plot_bgcolor='white'
-    )
+# --preview: muestra estratificada por año y blanco (resultados aproximados)
+VISTA_PREVIA = '--preview' in sys.argv
 
-    fig.update_traces(
-        textfont_size=18
+if VISTA_PREVIA:
+    from vista_previa import muestrear_hoja
+    df = muestrear_hoja(
+        archivo, hoja, ["PRODUCTO", "AÑO"],
+        columnas_estrato=["AÑO", "BLANCO BIOLOGICO"],
+        normalizar={"BLANCO BIOLOGICO": lambda v: normalizar_blanco(limpiar_texto(v))}
     )
-
-    fig.update_layout(showlegend=mostrar_leyenda)
-
-    return fig
+else:
+    df = cargar_hoja(archivo, hoja, ["PRODUCTO", "AÑO"])
 # ===============================
 # ESTILO GLOBAL MATPLOTLIB / SEABORN (XXL)
 # ===============================
@@ -109,17 +98,12 @@ mpl.rcParams.update({
 
 sns.set_context("talk")
 
+# el estilo forma parte de la llave de la cache de figuras
+configurar_estilo(estilo_grafica, PALETA_MORADO, PALETA_MORADO3, ORDEN_BLANCOS)
+
 # ===============================
 # 5. LIMPIEZA DE COLUMNAS
 # ===============================
-def limpiar_texto(x):
-    if pd.isna(x):
-        return None
-    x = str(x).strip()
-    x = unicodedata.normalize('NFKD', x)
-    x = x.encode('ascii', 'ignore').decode('utf-8')
-    return x.title()
-
 def limpiar_columnas(df):
     cols = []
     for col in df.columns:
@@ -132,6 +116,11 @@ def limpiar_columnas(df):
 
 df = limpiar_columnas(df)
 
+# perfil de calidad: se alimenta durante la misma limpieza
+from calidad_datos import PerfilCalidad
+
+perfil = PerfilCalidad(df)
+
 # ===============================
 # 6. LIMPIEZA GENERAL
 # ===============================
@@ -149,7 +138,7 @@ for c in campos_texto:
 # eliminar registros inválidos
 invalidos = ['No', 'N/A', 'None', '']
 for c in campos_texto:
-    df = df[~df[c].isin(invalidos)]
+    df = perfil.filtrar(df, ~df[c].isin(invalidos), f'{c} inválido')
 
 # ===============================
 # 7. UNIFICAR CLIENTES (ABCO)
@@ -167,32 +156,32 @@ df['cliente'] = df['cliente'].apply(normalizar_cliente)
 # 8. FECHAS Y NÚMEROS
 # ===============================
 if 'fecha' in df.columns:
-    df['fecha'] = pd.to_datetime(df['fecha'], dayfirst=True, errors='coerce')
+    df['fecha'] = perfil.a_fecha(df['fecha'], dayfirst=True)
 
 cols_num = ['cuenta', 'cuenta_producto', 'total_piezas', 'total_tallos_rechazados']
 for c in cols_num:
     if c in df.columns:
-        df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
+        df[c] = perfil.a_numero(df[c]).fillna(0)
 
 # ===============================
 # 9. NORMALIZAR BLANCO BIOLÓGICO
 # ===============================
-def normalizar_blanco(v):
-    if v is None:
-        return "OTROS"
-    v = v.upper()
+df['blanco_norm'] = df['blanco_biologico'].apply(normalizar_blanco)
+perfil.sin_mapear(df['blanco_biologico'], df['blanco_norm'], 'OTROS')
 
-    if "ACAR" in v: return "Acaros"
-    if "AFID" in v: return "Afidos"
-    if "BABOS" in v: return "Babosa"
-    if "DIPTER" in v or "MOSCA" in v: return "Diptero"
-    if "MINA" in v: return "Minador"
-    if "MOLUS" in v or "CARAC" in v: return "Moluscos"
-    if "TRIP" in v: return "Trips"
+perfil.imprimir('– SALIDA')
 
-    return "OTROS"
+# ===============================
+# ALMACÉN COLUMNAR (compartido entre procesos)
+# ===============================
+from almacen_columnar import abrir_almacen, guardar_almacen
+from indice_bitmap import abrir_indices, construir_indices
 
-df['blanco_norm'] = df['blanco_biologico'].apply(normalizar_blanco)
+CARPETA_ALMACEN = "almacen_salida"
+if not VISTA_PREVIA:
+    guardar_almacen(df, CARPETA_ALMACEN)
+    # índices de mapas de bits por valor para filtros combinados
+    construir_indices(abrir_almacen(CARPETA_ALMACEN))
 
 # ===============================
 # 10. FILTRAR 2025
@@ -202,28 +191,84 @@ df_2025 = df[df['ano'] == 2025].copy()
 print("\n📊 DISTRIBUCIÓN BLANCOS 2025")
 print(df_2025['blanco_norm'].value_counts())
 
+# ===============================
+# 10.1 VISTA PREVIA (--preview): ESTIMACIONES CON IC 95%
+# ===============================
+if VISTA_PREVIA:
+    from vista_previa import estimar_conteos, estimar_proporciones
+
+    prev_blancos = estimar_proporciones(df_2025, 'blanco_norm')
+    prev_predios = estimar_conteos(df_2025, 'predio').head(10)
+    prev_clientes = estimar_conteos(df_2025, 'cliente').head(10)
+    prev_anual = estimar_conteos(df, ['ano', 'blanco_norm']).sort_index()
+
+    print("\n🔎 VISTA PREVIA – BLANCOS 2025 (%)")
+    print(prev_blancos.filter(like='_%').round(1))
+    print("\n🔎 VISTA PREVIA – TOP 10 PREDIOS 2025")
+    print(prev_predios.round(1))
+    print("\n🔎 VISTA PREVIA – TOP 10 CLIENTES 2025")
+    print(prev_clientes.round(1))
+    print("\n🔎 VISTA PREVIA – HISTÓRICO POR AÑO Y BLANCO")
+    print(prev_anual.round(1))
+
+    def grafica_vista_previa(datos, x, titulo):
+        datos = datos.reset_index()
+        fig = px.bar(
+            datos,
+            x=x,
+            y='estimado',
+            error_y=datos['ic_sup'] - datos['estimado'],
+            error_y_minus=datos['estimado'] - datos['ic_inf'],
+            title=titulo,
+            color_discrete_sequence=PALETA_MORADO3
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+        return estilo_grafica(fig, mostrar_leyenda=False)
+
+    mostrar_figura(
+        'vista_previa_blancos', prev_blancos, grafica_vista_previa,
+        'blanco_norm', 'Vista previa – Interceptaciones por Blanco 2025 (IC 95%)'
+    )
+    mostrar_figura(
+        'vista_previa_predios', prev_predios, grafica_vista_previa,
+        'predio', 'Vista previa – Top 10 Predios 2025 (IC 95%)'
+    )
+
+    print("\n⚠️ Resultados aproximados. Ejecute sin --preview para el cálculo exacto.")
+    sys.exit(0)
+
+# ===============================
+# 10.2 TOP-K EN STREAMING (CLIENTES, PREDIOS, PAÍSES)
+# ===============================
+from top_frecuentes import TopKStreaming
+
+top_k = TopKStreaming(['cliente', 'predio', 'pais']).actualizar(df)
+
 # ===============================
 # 11. DONUT — DISTRIBUCIÓN GENERAL
 # ===============================
 dist = df_2025['blanco_norm'].value_counts().reset_index()
 dist.columns = ['blanco', 'interceptaciones']
 
-fig = px.pie(
-    dist,
-    names='blanco',
-    values='interceptaciones',
-    hole=0.45,
-    title='Distribución de Interceptaciones por Blanco Biológico – 2025',
-    color_discrete_sequence=PALETA_MORADO3
-)
+def grafica_donut_blancos_2025(datos):
+    fig = px.pie(
+        datos,
+        names='blanco',
+        values='interceptaciones',
+        hole=0.45,
+        title='Distribución de Interceptaciones por Blanco Biológico – 2025',
+        color_discrete_sequence=PALETA_MORADO3
+    )
 
-fig.update_traces(
-    textposition='inside',
-    textinfo='percent+label',
-    textfont_size=14
-)
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        textfont_size=14
+    )
+
+    return estilo_grafica(fig, mostrar_leyenda=True)
 
-estilo_grafica(fig, mostrar_leyenda=True).show()
+mostrar_figura('donut_blancos_2025', dist, grafica_donut_blancos_2025)
 
 
 # ===============================
@@ -236,22 +281,25 @@ predio_blanco = (
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    predio_blanco,
-    x='predio',
-    y='interceptaciones',
-    color='blanco_norm',
-    title='Interceptaciones 2025 por Predio y Blanco Biológico',
-    text_auto=True,
-    color_discrete_map=PALETA_MORADO
-)
+def grafica_predio_blanco_2025(datos):
+    fig = px.bar(
+        datos,
+        x='predio',
+        y='interceptaciones',
+        color='blanco_norm',
+        title='Interceptaciones 2025 por Predio y Blanco Biológico',
+        text_auto=True,
+        color_discrete_map=PALETA_MORADO
+    )
 
-fig.update_layout(
-    barmode='stack',
-    xaxis_tickangle=-45
-)
+    fig.update_layout(
+        barmode='stack',
+        xaxis_tickangle=-45
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('predio_blanco_2025', predio_blanco, grafica_predio_blanco_2025)
 
 
 
@@ -265,22 +313,25 @@ pos_blanco = (
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    pos_blanco,
-    x='poscosecha_proceso',
-    y='interceptaciones',
-    color='blanco_norm',
-    title='Interceptaciones 2025 por Poscosecha y Blanco Biológico',
-    text_auto=True,
-    color_discrete_map=PALETA_MORADO
-)
+def grafica_poscosecha_blanco_2025(datos):
+    fig = px.bar(
+        datos,
+        x='poscosecha_proceso',
+        y='interceptaciones',
+        color='blanco_norm',
+        title='Interceptaciones 2025 por Poscosecha y Blanco Biológico',
+        text_auto=True,
+        color_discrete_map=PALETA_MORADO
+    )
 
-fig.update_layout(
-    barmode='stack',
-    xaxis_tickangle=-45
-)
+    fig.update_layout(
+        barmode='stack',
+        xaxis_tickangle=-45
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('poscosecha_blanco_2025', pos_blanco, grafica_poscosecha_blanco_2025)
 
 
 ORDEN_BLANCOS = ["Trips", "Afidos"]
@@ -305,35 +356,33 @@ pais_blanco = (
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    pais_blanco,
-    x='pais',
-    y='interceptaciones',
-    color='blanco_norm',
-    title='Interceptaciones 2025 por País Destino',
-    text_auto=True,
-    category_orders={'blanco_norm': ORDEN_BLANCOS},
-    color_discrete_map=PALETA_MORADO
-)
+def grafica_pais_blanco_2025(datos):
+    fig = px.bar(
+        datos,
+        x='pais',
+        y='interceptaciones',
+        color='blanco_norm',
+        title='Interceptaciones 2025 por País Destino',
+        text_auto=True,
+        category_orders={'blanco_norm': ORDEN_BLANCOS},
+        color_discrete_map=PALETA_MORADO
+    )
 
-fig.update_layout(
-    barmode='stack',
-    xaxis_tickangle=-45
-)
+    fig.update_layout(
+        barmode='stack',
+        xaxis_tickangle=-45
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('pais_blanco_2025', pais_blanco, grafica_pais_blanco_2025)
 
 
 
 # ===============================
 # 15. BARRAS APILADAS — TOP 10 CLIENTES
 # ===============================
-top_clientes = (
-    df_2025['cliente']
-    .value_counts()
-    .head(10)
-    .index
-)
+top_clientes = top_k.top('cliente', df_2025, 10, ano=2025).index
 
 cliente_blanco = (
     df_2025[df_2025['cliente'].isin(top_clientes)]
@@ -342,22 +391,25 @@ cliente_blanco = (
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    cliente_blanco,
-    x='cliente',
-    y='interceptaciones',
-    color='blanco_norm',
-    title='Top 10 Clientes con Interceptaciones – 2025',
-    text_auto=True,
-    color_discrete_map=PALETA_MORADO
-)
+def grafica_top10_clientes_2025(datos):
+    fig = px.bar(
+        datos,
+        x='cliente',
+        y='interceptaciones',
+        color='blanco_norm',
+        title='Top 10 Clientes con Interceptaciones – 2025',
+        text_auto=True,
+        color_discrete_map=PALETA_MORADO
+    )
 
-fig.update_layout(
-    barmode='stack',
-    xaxis_tickangle=-45
-)
+    fig.update_layout(
+        barmode='stack',
+        xaxis_tickangle=-45
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('top10_clientes_2025', cliente_blanco, grafica_top10_clientes_2025)
 
 
 
@@ -366,9 +418,10 @@ print("✅ ANÁLISIS 2025 FINALIZADO – VISUALES EJECUTIVAS")
 # ===============================
 # 16. ANÁLISIS HISTÓRICO (2023-2025)
 # ===============================
-df_hist = df[
-    (df['ano'].isin([2023, 2024, 2025])) &
-    (df['blanco_norm'].isin(['Trips', 'Afidos']))
+indice = abrir_indices(CARPETA_ALMACEN)
+
+df_hist = df.iloc[
+    indice.filas(ano=[2023, 2024, 2025], blanco_norm=['Trips', 'Afidos'])
 ].copy()
 
 # ===============================
@@ -389,18 +442,21 @@ import plotly.express as px
 # ===============================
 # 18. BARRAS AGRUPADAS — KPI ANUAL
 # ===============================
-fig = px.bar(
-    kpi_anual,
-    x='ano',
-    y='interceptaciones',
-    color='blanco_norm',
-    barmode='group',
-    text_auto=True,
-    title='Evolución Anual de Interceptaciones – Puerto de Salida',
-    color_discrete_map=PALETA_MORADO
-)
+def grafica_kpi_anual(datos):
+    fig = px.bar(
+        datos,
+        x='ano',
+        y='interceptaciones',
+        color='blanco_norm',
+        barmode='group',
+        text_auto=True,
+        title='Evolución Anual de Interceptaciones – Puerto de Salida',
+        color_discrete_map=PALETA_MORADO
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('kpi_anual', kpi_anual, grafica_kpi_anual)
 
 
 def forzar_orden_blancos(df):
@@ -422,34 +478,33 @@ predios_hist = (
     .reset_index(name='interceptaciones')
 )
 
-top_predios = (
-    predios_hist
-    .groupby('predio')['interceptaciones']
-    .sum()
-    .sort_values(ascending=False)
-    .head(10)
-    .index
-)
+top_predios = top_k.top(
+    'predio', df_hist, 10,
+    ano=[2023, 2024, 2025], blanco_norm=['Trips', 'Afidos']
+).index
 
 predios_hist = predios_hist[predios_hist['predio'].isin(top_predios)]
 
-fig = px.bar(
-    predios_hist,
-    x='predio',
-    y='interceptaciones',
-    color='blanco_norm',
-    text_auto=True,
-    title='Top 10 Predios Reincidentes – Interceptaciones Históricas',
-    category_orders={'blanco_norm': ORDEN_BLANCOS},
-    color_discrete_map=PALETA_MORADO
-)
+def grafica_predios_reincidentes(datos):
+    fig = px.bar(
+        datos,
+        x='predio',
+        y='interceptaciones',
+        color='blanco_norm',
+        text_auto=True,
+        title='Top 10 Predios Reincidentes – Interceptaciones Históricas',
+        category_orders={'blanco_norm': ORDEN_BLANCOS},
+        color_discrete_map=PALETA_MORADO
+    )
 
-fig.update_layout(
-    barmode='stack',
-    xaxis_tickangle=-45
-)
+    fig.update_layout(
+        barmode='stack',
+        xaxis_tickangle=-45
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('predios_reincidentes', predios_hist, grafica_predios_reincidentes)
 
 
 # ===============================
@@ -463,33 +518,32 @@ clientes_hist = (
     .reset_index(name='interceptaciones')
 )
 
-top_clientes = (
-    clientes_hist
-    .groupby('cliente')['interceptaciones']
-    .sum()
-    .sort_values(ascending=False)
-    .head(10)
-    .index
-)
+top_clientes = top_k.top(
+    'cliente', df_hist, 10,
+    ano=[2023, 2024, 2025], blanco_norm=['Trips', 'Afidos']
+).index
 
 clientes_hist = clientes_hist[clientes_hist['cliente'].isin(top_clientes)]
 
-fig = px.bar(
-    clientes_hist,
-    x='cliente',
-    y='interceptaciones',
-    color='blanco_norm',
-    text_auto=True,
-    title='Top 10 Clientes con Interceptaciones – Histórico',
-    color_discrete_map=PALETA_MORADO
-)
+def grafica_clientes_reincidentes(datos):
+    fig = px.bar(
+        datos,
+        x='cliente',
+        y='interceptaciones',
+        color='blanco_norm',
+        text_auto=True,
+        title='Top 10 Clientes con Interceptaciones – Histórico',
+        color_discrete_map=PALETA_MORADO
+    )
 
-fig.update_layout(
-    barmode='stack',
-    xaxis_tickangle=-45
-)
+    fig.update_layout(
+        barmode='stack',
+        xaxis_tickangle=-45
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('clientes_reincidentes', clientes_hist, grafica_clientes_reincidentes)
 
 
 # ===============================
@@ -513,52 +567,91 @@ print("\n📉 VARIACIÓN INTERANUAL (%)")
 print(pivot_yoy.round(1))
 
 # ===============================
-# 22. ANÁLISIS SEMÁFORO SANITARIO 2025
+# LIBRO DE EXPORTACIONES (VOLUMEN DESPACHADO)
 # ===============================
-riesgo_predio = (
-    df_2025
-    .groupby(['predio', 'blanco_norm'])
-    .size()
-    .reset_index(name='interceptaciones')
-)
+from volumen_exportado import cargar_libro, perdida_por, volumen_por
 
-# Solo Trips y Afidos
-riesgo_predio = riesgo_predio[
-    riesgo_predio['blanco_norm'].isin(['Trips', 'Afidos'])
-]
+ARCHIVO_EXPORTACIONES = "exportaciones.csv"
+CARPETA_EXPORTACIONES = "exportaciones_columnar"
 
-# Pivot
-matriz = riesgo_predio.pivot_table(
-    index='predio',
-    columns='blanco_norm',
-    values='interceptaciones',
-    fill_value=0
-)
+libro_exportaciones = cargar_libro(ARCHIVO_EXPORTACIONES, CARPETA_EXPORTACIONES)
 
-# Total
-matriz['Total'] = matriz.sum(axis=1)
+if libro_exportaciones is not None:
+    libro_exportaciones['cliente'] = (
+        libro_exportaciones['cliente']
+        .map(normalizar_cliente)
+        .astype('category')
+    )
+    print(f"\n🚚 Libro de exportaciones: {len(libro_exportaciones):,} registros")
+else:
+    print(f"\n⚠️ No se encontró {ARCHIVO_EXPORTACIONES}: se usa el total fijo 2025")
 
-# Top predios
-matriz = matriz.sort_values('Total', ascending=False).head(15)
-matriz = matriz.astype(int)
+# ===============================
+# 22. ANÁLISIS SEMÁFORO SANITARIO 2025
+# ===============================
+from riesgo import calcular_riesgo, top_riesgo, ranking_completo
 
-plt.figure(figsize=(8, 10))
+# Tasa ponderada por blanco y normalizada por volumen (todas las entidades)
+# La escala y la unidad van por entidad: tallos del libro de exportaciones
+# donde el libro trae la entidad, total_piezas donde no (p. ej. país)
+UNIDADES_RIESGO = {
+    'tallos': (1_000_000, 'millón de tallos exportados'),
+    'piezas': (1000, '1000 piezas')
+}
 
-sns.heatmap(
-    matriz[['Trips', 'Afidos']],
-    annot=True,
-    fmt='d',
-    cmap='Reds',
-    linewidths=0.8,
-    cbar_kws={'label': 'Número de interceptaciones'},
-    annot_kws={"size": 30}
-)
+riesgo_2025 = {}
+unidad_riesgo = {}
+for entidad in ['predio', 'cliente', 'pais']:
+    volumen = None
+    if libro_exportaciones is not None and entidad in libro_exportaciones:
+        volumen = volumen_por(libro_exportaciones, entidad, ano=2025)
+    escala, unidad_riesgo[entidad] = UNIDADES_RIESGO[
+        'piezas' if volumen is None else 'tallos'
+    ]
+    riesgo_2025[entidad] = calcular_riesgo(
+        df[df['ano'] == 2025],
+        entidad,
+        volumen=volumen,
+        por=escala
+    ).assign(unidad=unidad_riesgo[entidad])
+
+# Top predios (selección parcial)
+matriz = top_riesgo(riesgo_2025['predio'], 15)
+matriz = matriz.reindex(
+    columns=[f'tasa_{b}' for b in ORDEN_BLANCOS], fill_value=0
+)
+matriz.columns = ORDEN_BLANCOS
+
+print("\n🚦 TOP 15 PREDIOS POR RIESGO NORMALIZADO 2025")
+print(
+    top_riesgo(riesgo_2025['predio'], 15)
+    [['eventos_ponderados', 'volumen', 'tasa', 'indice']]
+    .round(2)
+)
+
+def grafica_matriz_riesgo(datos, unidad):
+    fig = plt.figure(figsize=(8, 10))
+
+    sns.heatmap(
+        datos[ORDEN_BLANCOS],
+        annot=True,
+        fmt='.1f',
+        cmap='Reds',
+        linewidths=0.8,
+        cbar_kws={'label': f'Interceptaciones ponderadas por {unidad}'},
+        annot_kws={"size": 30}
+    )
+
+    plt.title('Matriz de Riesgo Sanitario por Predio – Puerto de Salida 2025', pad=20)
+    plt.xlabel('Blanco Biológico')
+    plt.ylabel('Predio')
+    plt.tight_layout()
 
-plt.title('Matriz de Riesgo Sanitario por Predio – Puerto de Salida 2025', pad=20)
-plt.xlabel('Blanco Biológico')
-plt.ylabel('Predio')
-plt.tight_layout()
-plt.show()
+    return fig
+
+mostrar_figura(
+    'matriz_riesgo', matriz, grafica_matriz_riesgo, unidad_riesgo['predio']
+)
 
 # ===============================
 # IMPACTO EN TALLOS – 2025
@@ -566,6 +659,36 @@ plt.show()
 
 TOTAL_EXPORTADOS_2025 = 22433766
 
+if libro_exportaciones is not None:
+    perdida_anual = perdida_por(df, libro_exportaciones, 'ano')
+    exportados_2025 = perdida_anual['tallos_exportados'].get(2025, 0)
+
+    # sin despachos de 2025 en el libro se conserva el total fijo
+    if exportados_2025 > 0:
+        TOTAL_EXPORTADOS_2025 = int(exportados_2025)
+    else:
+        print("⚠️ El libro de exportaciones no tiene 2025: se usa el total fijo")
+
+    print("\n📉 PÉRDIDA PORCENTUAL POR AÑO")
+    print(perdida_anual.round(4))
+
+    print("\n📉 PÉRDIDA PORCENTUAL POR MES – 2025")
+    perdida_mes = perdida_por(df, libro_exportaciones, 'mes')
+    print(perdida_mes[perdida_mes.index.year == 2025].round(4))
+
+    for entidad in ['predio', 'cliente']:
+        print(f"\n📉 PÉRDIDA PORCENTUAL POR {entidad.upper()} – 2025")
+        perdida = perdida_por(df, libro_exportaciones, ['ano', entidad])
+        if 2025 not in perdida.index.get_level_values('ano'):
+            print("Sin datos 2025")
+            continue
+        print(
+            perdida.loc[2025]
+            .sort_values('perdida_%', ascending=False)
+            .head(10)
+            .round(4)
+        )
+
 tallos_perdidos_2025 = (
     df_2025['total_tallos_rechazados']
     .sum()
@@ -582,31 +705,145 @@ print("📉 IMPACTO PRODUCTIVO 2025")
 print(f"Total exportados: {TOTAL_EXPORTADOS_2025:,}")
 print(f"Tallos perdidos: {tallos_perdidos_2025:,}")
 print(f"Pérdida porcentual: {porcentaje_perdida:.4f}%")
-plt.figure(figsize=(8, 6))
 
-sns.barplot(
-    data=impacto,
-    x='categoria',
-    y='tallos',
-    palette=['#5E2B97', '#B39DDB']  # morado empresa
+def grafica_impacto_tallos(datos):
+    fig = plt.figure(figsize=(8, 6))
+
+    sns.barplot(
+        data=datos,
+        x='categoria',
+        y='tallos',
+        palette=['#5E2B97', '#B39DDB']  # morado empresa
+    )
+
+    plt.title('Impacto de Interceptaciones en Tallos – Puerto de Salida 2025', pad=20)
+    plt.ylabel('Número de Tallos')
+    plt.xlabel('')
+    plt.ticklabel_format(style='plain', axis='y')
+
+    # Etiquetas
+    for index, row in datos.iterrows():
+        plt.text(
+            index,
+            row['tallos'],
+            f"{row['tallos']:,}",
+            ha='center',
+            va='bottom',
+            fontweight='bold',
+            fontsize=32
+        )
+
+    plt.tight_layout()
+
+    return fig
+
+mostrar_figura('impacto_tallos', impacto, grafica_impacto_tallos)
+
+# ===============================
+# 23. TENDENCIA SEMANAL – 2025
+# ===============================
+from kpi_temporal import KPITemporal
+
+kpi_temporal = KPITemporal(
+    df,
+    col_fecha='fecha',
+    dimensiones=['blanco_norm', 'predio', 'cliente', 'pais'],
+    col_tallos='total_tallos_rechazados'
+).precalcular()
+
+tendencia_blancos = kpi_temporal.tendencia(
+    'blanco_norm',
+    valores=ORDEN_BLANCOS,
+    frecuencia='semanal'
+)
+tendencia_blancos = tendencia_blancos[
+    tendencia_blancos['periodo'].dt.year == 2025
+]
+
+def grafica_tendencia_semanal(datos):
+    fig = px.line(
+        datos,
+        x='periodo',
+        y='interceptaciones_movil',
+        color='blanco_norm',
+        markers=True,
+        title='Tendencia Semanal de Interceptaciones (media móvil 4 semanas) – 2025',
+        category_orders={'blanco_norm': ORDEN_BLANCOS},
+        color_discrete_map=PALETA_MORADO
+    )
+
+    return estilo_grafica(fig)
+
+mostrar_figura('tendencia_semanal', tendencia_blancos, grafica_tendencia_semanal)
+
+# ===============================
+# 24. ALERTAS DE PICOS (EWMA / CUSUM)
+# ===============================
+from alertas import DetectorPicos, ARCHIVO_ESTADO
+
+detector = DetectorPicos.cargar(
+    'salida_' + ARCHIVO_ESTADO,
+    dimensiones=['predio', 'cliente', 'pais'],
+    col_fecha='fecha'
 )
 
-plt.title('Impacto de Interceptaciones en Tallos – Puerto de Salida 2025', pad=20)
-plt.ylabel('Número de Tallos')
-plt.xlabel('')
-plt.ticklabel_format(style='plain', axis='y')
-
-# Etiquetas
-for index, row in impacto.iterrows():
-    plt.text(
-        index,
-        row['tallos'],
-        f"{row['tallos']:,}",
-        ha='center',
-        va='bottom',
-        fontweight='bold',
-        fontsize=32
+alertas = detector.ingerir(detector.nuevas_filas(df))
+detector.guardar('salida_' + ARCHIVO_ESTADO)
+
+print("\n🚨 ALERTAS DE PICOS (filas nuevas)")
+if alertas.empty:
+    print("Sin alertas")
+else:
+    print(alertas.tail(20).to_string(index=False))
+
+# ===============================
+# 25. EXPORTAR KPI A EXCEL
+# ===============================
+from exportar_kpi import registrar_tablas, exportar_libro
+
+def detalle_por(entidad):
+    return (
+        df
+        .groupby(['ano', entidad, 'blanco_norm'])
+        .agg(
+            interceptaciones=('blanco_norm', 'size'),
+            tallos_rechazados=('total_tallos_rechazados', 'sum')
+        )
+    )
+
+tablas_kpi = {
+    'calidad_datos': perfil.reporte(),
+    'resumen_anual': (
+        df.groupby('ano')
+        .agg(
+            registros=('ano', 'size'),
+            tallos_rechazados=('total_tallos_rechazados', 'sum')
+        )
+    ),
+    'kpi_anual': kpi_anual,
+    'variacion_interanual': pivot_yoy.round(1),
+    'matriz_riesgo': matriz,
+    'top10_predios': predios_hist,
+    'top10_clientes': clientes_hist,
+    'riesgo_predio': ranking_completo(riesgo_2025['predio']),
+    'riesgo_cliente': ranking_completo(riesgo_2025['cliente']),
+    'riesgo_pais': ranking_completo(riesgo_2025['pais']),
+    'detalle_predio': detalle_por('predio'),
+    'detalle_cliente': detalle_por('cliente'),
+    'semanal_predio': kpi_temporal.tendencia('predio', frecuencia='semanal')
+}
+
+if libro_exportaciones is not None:
+    tablas_kpi['perdida_anual'] = perdida_por(df, libro_exportaciones, 'ano')
+    tablas_kpi['perdida_mensual'] = perdida_por(df, libro_exportaciones, 'mes')
+    tablas_kpi['perdida_predio'] = perdida_por(
+        df, libro_exportaciones, ['ano', 'predio']
+    )
+    tablas_kpi['perdida_cliente'] = perdida_por(
+        df, libro_exportaciones, ['ano', 'cliente']
     )
 
-plt.tight_layout()
-plt.show()
+registrar_tablas('Salida', tablas_kpi)
+ruta_kpi = exportar_libro()
+if ruta_kpi is not None:
+    print(f"\n📁 KPI exportados a {ruta_kpi}")
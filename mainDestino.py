@@ -1,7 +1,12 @@
+import sys
 import pandas as pd
 import unicodedata
 import plotly.express as px
 
+from carga import cargar_hoja
+from renderizado import configurar_estilo, mostrar_figura
+from estilo_graficas import PALETA_DESTINO, estilo_grafica
+
 # ===============================
 # 1. ARCHIVO Y HOJA
 # ===============================
@@ -9,76 +14,10 @@ archivo = "DatosDestino.xlsx"
 hoja = "Base Interc."
 
 # ===============================
-# 2. CARGAR SIN HEADER
-# ===============================
-raw = pd.read_excel(archivo, sheet_name=hoja, header=None)
-
-# ===============================
-# 3. DETECTAR FILA DE ENCABEZADOS
-# ===============================
-header_row = None
-for i in range(len(raw)):
-    fila = raw.iloc[i].astype(str).str.upper().tolist()
-    if "PRODUCTO" in fila and "PUERTO DESTINO" in fila:
-        header_row = i
-        break
-
-if header_row is None:
-    raise ValueError("❌ No se encontró la fila de encabezados")
-
-print(f"✅ Encabezados encontrados en la fila {header_row}")
-
-# ===============================
-# FUNCIÓN ESTÁNDAR DE ESTILO PLOTLY
-# ===============================
-def estilo_grafica(fig, mostrar_leyenda=True):
-    fig.update_layout(
-        font=dict(size=40),
-        title=dict(font=dict(size=56)),
-        xaxis=dict(
-            title_font=dict(size=44),
-            tickfont=dict(size=36)
-        ),
-        yaxis=dict(
-            title_font=dict(size=44),
-            tickfont=dict(size=36)
-        ),
-        legend=dict(font=dict(size=36)),
-        bargap=0.3,
-        plot_bgcolor='white'
-    )
-
-    fig.update_traces(
-        textfont_size=18
-    )
-
-    fig.update_layout(showlegend=mostrar_leyenda)
-
-    return fig
-
-# ===============================
-# 4. RELEER CON HEADER CORRECTO
-# ===============================
-df = pd.read_excel(archivo, sheet_name=hoja, header=header_row)
-
-# ===============================
-# 5. LIMPIEZA DE COLUMNAS
-# ===============================
-def limpiar_columnas(df):
-    cols = []
-    for col in df.columns:
-        col = unicodedata.normalize('NFKD', str(col))
-        col = col.encode('ascii', 'ignore').decode('utf-8')
-        col = col.strip().lower().replace(" ", "_").replace(".", "")
-        cols.append(col)
-    df.columns = cols
-    return df
-
-df = limpiar_columnas(df)
-
-# ===============================
-# 6. LIMPIEZA DE TEXTO GENERAL
+# 1.1 LIMPIEZA DE TEXTO Y NORMALIZACIÓN DE BLANCOS
 # ===============================
+# se definen antes de cargar: --preview estratifica por el blanco ya
+# normalizado
 def limpiar_texto(x):
     if pd.isna(x):
         return None
@@ -87,15 +26,6 @@ def limpiar_texto(x):
     x = x.encode('ascii', 'ignore').decode('utf-8')
     return x.title()
 
-campos_texto = ['producto', 'puerto_destino', 'cliente', 'blanco_biolog']
-
-for c in campos_texto:
-    if c in df.columns:
-        df[c] = df[c].apply(limpiar_texto)
-
-# ===============================
-# 7. NORMALIZAR BLANCO BIOLÓGICO – DESTINO
-# ===============================
 def normalizar_blanco_destino(valor):
     if valor is None:
         return "No especificado"
@@ -134,7 +64,56 @@ def normalizar_blanco_destino(valor):
 
     return "No especificado"
 
+# ===============================
+# 2-3. CARGAR HOJA Y DETECTAR FILA DE ENCABEZADOS
+# ===============================
+# --preview: muestra estratificada por año y blanco (resultados aproximados)
+VISTA_PREVIA = '--preview' in sys.argv
+
+if VISTA_PREVIA:
+    from vista_previa import muestrear_hoja
+    df = muestrear_hoja(
+        archivo, hoja, ["PRODUCTO", "PUERTO DESTINO"],
+        columnas_estrato=["AÑO", "BLANCO BIOLOG."],
+        normalizar={"BLANCO BIOLOG.": lambda v: normalizar_blanco_destino(limpiar_texto(v))}
+    )
+else:
+    df = cargar_hoja(archivo, hoja, ["PRODUCTO", "PUERTO DESTINO"])
+
+# ===============================
+# 5. LIMPIEZA DE COLUMNAS
+# ===============================
+def limpiar_columnas(df):
+    cols = []
+    for col in df.columns:
+        col = unicodedata.normalize('NFKD', str(col))
+        col = col.encode('ascii', 'ignore').decode('utf-8')
+        col = col.strip().lower().replace(" ", "_").replace(".", "")
+        cols.append(col)
+    df.columns = cols
+    return df
+
+df = limpiar_columnas(df)
+
+# perfil de calidad: se alimenta durante la misma limpieza
+from calidad_datos import PerfilCalidad
+
+perfil = PerfilCalidad(df)
+
+# ===============================
+# 6. LIMPIEZA DE TEXTO GENERAL
+# ===============================
+campos_texto = ['producto', 'puerto_destino', 'cliente', 'blanco_biolog']
+
+for c in campos_texto:
+    if c in df.columns:
+        df[c] = df[c].apply(limpiar_texto)
+
+# ===============================
+# 7. NORMALIZAR BLANCO BIOLÓGICO – DESTINO
+# ===============================
 df['blanco_norm'] = df['blanco_biolog'].apply(normalizar_blanco_destino)
+perfil.sin_mapear(df['blanco_biolog'], df['blanco_norm'], 'No especificado')
 
 # ===============================
 # 8. NORMALIZAR CLIENTES
@@ -148,11 +127,11 @@ mapa_clientes = {
 
 df['cliente'] = df['cliente'].replace(mapa_clientes)
 
-df = df[~df['cliente'].isin([
+df = perfil.filtrar(df, ~df['cliente'].isin([
     "No Identificado",
     "No Intercep.",
     "Interceptaciones Ica"
-])]
+]), 'cliente no identificado')
 
 # ===============================
 # 9. NORMALIZAR PRODUCTO
@@ -169,18 +148,38 @@ def normalizar_producto(valor):
     return v
 
 df['producto_norm'] = df['producto'].apply(normalizar_producto)
-df = df[df['producto_norm'].notna()]
+df = perfil.filtrar(df, df['producto_norm'].notna(), 'producto sin identificar')
 
 # ===============================
 # 10. FECHAS Y AÑO
 # ===============================
-df['interception_date'] = pd.to_datetime(
+df['interception_date'] = perfil.a_fecha(
     df.get('interception_date'),
-    errors='coerce',
     dayfirst=True
 )
 
-df['ano'] = pd.to_numeric(df.get('ano'), errors='coerce')
+df['ano'] = perfil.a_numero(df.get('ano'))
+
+perfil.imprimir('– DESTINO')
+
+# ===============================
+# ALMACÉN COLUMNAR (compartido entre procesos)
+# ===============================
+from almacen_columnar import abrir_almacen, guardar_almacen
+from indice_bitmap import abrir_indices, construir_indices
+
+CARPETA_ALMACEN = "almacen_destino"
+if not VISTA_PREVIA:
+    guardar_almacen(df, CARPETA_ALMACEN)
+    # índices de mapas de bits por valor para filtros combinados
+    construir_indices(abrir_almacen(CARPETA_ALMACEN))
+
+# ===============================
+# 10.1 TOP-K EN STREAMING (CLIENTES, PUERTOS, PRODUCTOS)
+# ===============================
+from top_frecuentes import TopKStreaming
+
+top_k = TopKStreaming(['cliente', 'puerto_destino', 'producto_norm']).actualizar(df)
 
 # ===============================
 # 11. VALIDACIÓN EN CONSOLA
@@ -198,10 +197,10 @@ print("📌 Blancos biológicos 2025:")
 print(df_2025['blanco_norm'].value_counts(), "\n")
 
 print("👥 Top clientes:")
-print(df_2025['cliente'].value_counts().head(10), "\n")
+print(top_k.top('cliente', df_2025, 10, ano=ANIO_REPORTE), "\n")
 
 print("🌸 Top productos:")
-print(df_2025['producto_norm'].value_counts().head(10), "\n")
+print(top_k.top('producto_norm', df_2025, 10, ano=ANIO_REPORTE), "\n")
 
 print("📊 Histórico 2023–2025:")
 print(
@@ -210,22 +209,61 @@ print(
     .size()
 )
 print("🌍 Top países destino 2025:")
-print(
-    df_2025['puerto_destino']
-    .value_counts()
-    .head(10),
-    "\n"
-)
+print(top_k.top('puerto_destino', df_2025, 10, ano=ANIO_REPORTE), "\n")
 
 print("===================================================\n")
 
 # ===============================
 # CONFIGURACIÓN GRÁFICAS
 # ===============================
-PALETA_DESTINO = [
-    '#6A0DAD', '#B19CD9', '#9B59B6',
-    '#D7BDE2', '#BB8FCE', '#7D3C98'
-]
+# el estilo forma parte de la llave de la cache de figuras
+configurar_estilo(estilo_grafica, PALETA_DESTINO)
+
+# ===============================
+# VISTA PREVIA (--preview): ESTIMACIONES CON IC 95%
+# ===============================
+if VISTA_PREVIA:
+    from vista_previa import estimar_conteos, estimar_proporciones
+
+    prev_blancos = estimar_proporciones(df_2025, 'blanco_norm')
+    prev_clientes = estimar_conteos(df_2025, 'cliente').head(10)
+    prev_puertos = estimar_conteos(df_2025, 'puerto_destino').head(10)
+    prev_anual = estimar_conteos(df, ['ano', 'blanco_norm']).sort_index()
+
+    print("\n🔎 VISTA PREVIA – BLANCOS 2025 (%)")
+    print(prev_blancos.filter(like='_%').round(1))
+    print("\n🔎 VISTA PREVIA – TOP 10 CLIENTES 2025")
+    print(prev_clientes.round(1))
+    print("\n🔎 VISTA PREVIA – TOP 10 PUERTOS DESTINO 2025")
+    print(prev_puertos.round(1))
+    print("\n🔎 VISTA PREVIA – HISTÓRICO POR AÑO Y BLANCO")
+    print(prev_anual.round(1))
+
+    def grafica_vista_previa(datos, x, titulo):
+        datos = datos.reset_index()
+        fig = px.bar(
+            datos,
+            x=x,
+            y='estimado',
+            error_y=datos['ic_sup'] - datos['estimado'],
+            error_y_minus=datos['estimado'] - datos['ic_inf'],
+            title=titulo,
+            color_discrete_sequence=PALETA_DESTINO
+        )
+        fig.update_layout(xaxis_tickangle=-45)
+        return estilo_grafica(fig, mostrar_leyenda=False)
+
+    mostrar_figura(
+        'vista_previa_blancos_destino', prev_blancos, grafica_vista_previa,
+        'blanco_norm', 'Vista previa – Interceptaciones en Destino 2025 (IC 95%)'
+    )
+    mostrar_figura(
+        'vista_previa_clientes_destino', prev_clientes, grafica_vista_previa,
+        'cliente', 'Vista previa – Top 10 Clientes 2025 (IC 95%)'
+    )
+
+    print("\n⚠️ Resultados aproximados. Ejecute sin --preview para el cálculo exacto.")
+    sys.exit(0)
 
 # ===============================
 # 1. DISTRIBUCIÓN GENERAL 2025
@@ -237,53 +275,56 @@ dist_blancos_2025 = (
     .sort_values('interceptaciones')
 )
 
-fig = px.bar(
-    dist_blancos_2025,
-    x='interceptaciones',
-    y='blanco_norm',
-    orientation='h',
-    text='interceptaciones',
-    title='Distribución de Interceptaciones por Blanco Biológico – Destino 2025',
-    color='blanco_norm',
-    color_discrete_sequence=PALETA_DESTINO
-)
+def grafica_blancos_destino_2025(datos):
+    fig = px.bar(
+        datos,
+        x='interceptaciones',
+        y='blanco_norm',
+        orientation='h',
+        text='interceptaciones',
+        title='Distribución de Interceptaciones por Blanco Biológico – Destino 2025',
+        color='blanco_norm',
+        color_discrete_sequence=PALETA_DESTINO
+    )
+
+    return estilo_grafica(fig, mostrar_leyenda=False)
 
-estilo_grafica(fig, mostrar_leyenda=False).show()
+mostrar_figura('blancos_destino_2025', dist_blancos_2025, grafica_blancos_destino_2025)
 
 
 # ===============================
 # 2. EVOLUCIÓN HISTÓRICA
 # ===============================
+indice = abrir_indices(CARPETA_ALMACEN)
+
 hist_blancos = (
-    df[df['ano'].isin(ANIOS_HIST)]
+    df.iloc[indice.filas(ano=ANIOS_HIST)]
     .groupby(['ano', 'blanco_norm'])
     .size()
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    hist_blancos,
-    x='ano',
-    y='interceptaciones',
-    color='blanco_norm',
-    barmode='stack',
-    text_auto=True,
-    title='Evolución Histórica de Interceptaciones – Destino (2023–2025)',
-    color_discrete_sequence=PALETA_DESTINO
-)
+def grafica_historico_destino(datos):
+    fig = px.bar(
+        datos,
+        x='ano',
+        y='interceptaciones',
+        color='blanco_norm',
+        barmode='stack',
+        text_auto=True,
+        title='Evolución Histórica de Interceptaciones – Destino (2023–2025)',
+        color_discrete_sequence=PALETA_DESTINO
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('historico_destino', hist_blancos, grafica_historico_destino)
 
 
 # ===============================
 # 3. TOP PAÍSES DESTINO – 2025
 # ===============================
-top_paises = (
-    df_2025['puerto_destino']
-    .value_counts()
-    .head(10)
-    .index
-)
+top_paises = top_k.top('puerto_destino', df_2025, 10, ano=ANIO_REPORTE).index
 
 pais_2025 = (
     df_2025[df_2025['puerto_destino'].isin(top_paises)]
@@ -292,25 +333,29 @@ pais_2025 = (
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    pais_2025,
-    x='puerto_destino',
-    y='interceptaciones',
-    color='blanco_norm',
-    barmode='stack',
-    text_auto=True,
-    title='Interceptaciones por País Destino – Top 10 (2025)',
-    color_discrete_sequence=PALETA_DESTINO
-)
+def grafica_top10_paises_destino(datos):
+    fig = px.bar(
+        datos,
+        x='puerto_destino',
+        y='interceptaciones',
+        color='blanco_norm',
+        barmode='stack',
+        text_auto=True,
+        title='Interceptaciones por País Destino – Top 10 (2025)',
+        color_discrete_sequence=PALETA_DESTINO
+    )
+
+    fig.update_layout(xaxis_tickangle=-45)
 
-fig.update_layout(xaxis_tickangle=-45)
-estilo_grafica(fig).show()
+    return estilo_grafica(fig)
+
+mostrar_figura('top10_paises_destino', pais_2025, grafica_top10_paises_destino)
 
 
 # ===============================
 # 4. TOP CLIENTES – 2025
 # ===============================
-top_clientes = df_2025['cliente'].value_counts().head(10).index
+top_clientes = top_k.top('cliente', df_2025, 10, ano=ANIO_REPORTE).index
 
 clientes_2025 = (
     df_2025[df_2025['cliente'].isin(top_clientes)]
@@ -319,23 +364,26 @@ clientes_2025 = (
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    clientes_2025,
-    x='interceptaciones',
-    y='cliente',
-    color='blanco_norm',
-    orientation='h',
-    text='interceptaciones',
-    title='Top 10 Clientes con Interceptaciones – Destino 2025',
-    color_discrete_sequence=PALETA_DESTINO
-)
+def grafica_top10_clientes_destino(datos):
+    fig = px.bar(
+        datos,
+        x='interceptaciones',
+        y='cliente',
+        color='blanco_norm',
+        orientation='h',
+        text='interceptaciones',
+        title='Top 10 Clientes con Interceptaciones – Destino 2025',
+        color_discrete_sequence=PALETA_DESTINO
+    )
+
+    return estilo_grafica(fig)
 
-estilo_grafica(fig).show()
+mostrar_figura('top10_clientes_destino', clientes_2025, grafica_top10_clientes_destino)
 
 # ===============================
 # 5. TOP PRODUCTOS – 2025
 # ===============================
-top_productos = df_2025['producto_norm'].value_counts().head(10).index
+top_productos = top_k.top('producto_norm', df_2025, 10, ano=ANIO_REPORTE).index
 
 productos_2025 = (
     df_2025[df_2025['producto_norm'].isin(top_productos)]
@@ -344,18 +392,110 @@ productos_2025 = (
     .reset_index(name='interceptaciones')
 )
 
-fig = px.bar(
-    productos_2025,
-    x='interceptaciones',
-    y='producto_norm',
-    color='blanco_norm',
-    orientation='h',
-    text='interceptaciones',
-    title='Top 10 Productos con Interceptaciones – Destino 2025',
-    color_discrete_sequence=PALETA_DESTINO
-)
+def grafica_top10_productos_destino(datos):
+    fig = px.bar(
+        datos,
+        x='interceptaciones',
+        y='producto_norm',
+        color='blanco_norm',
+        orientation='h',
+        text='interceptaciones',
+        title='Top 10 Productos con Interceptaciones – Destino 2025',
+        color_discrete_sequence=PALETA_DESTINO
+    )
 
-estilo_grafica(fig).show()
+    return estilo_grafica(fig)
+
+mostrar_figura('top10_productos_destino', productos_2025, grafica_top10_productos_destino)
 
 
 print("✅ INFORME DESTINO LISTO (DEPURADO + VALIDADO + 5 GRÁFICAS)")
+
+# ===============================
+# 6. TENDENCIA SEMANAL – 2025
+# ===============================
+from kpi_temporal import KPITemporal
+
+kpi_temporal = KPITemporal(
+    df,
+    col_fecha='interception_date',
+    dimensiones=['blanco_norm', 'puerto_destino', 'cliente', 'producto_norm'],
+    # TOTAL TALLOS es texto libre ("DESTRUCCION", "proceso Wayuu"...):
+    # Destino no tiene un campo de tallos rechazados
+    col_tallos=None
+).precalcular()
+
+tendencia_blancos = kpi_temporal.tendencia(
+    'blanco_norm',
+    valores=dist_blancos_2025['blanco_norm'].tolist(),
+    frecuencia='semanal'
+)
+tendencia_blancos = tendencia_blancos[
+    tendencia_blancos['periodo'].dt.year == ANIO_REPORTE
+]
+
+def grafica_tendencia_semanal_destino(datos):
+    fig = px.line(
+        datos,
+        x='periodo',
+        y='interceptaciones_movil',
+        color='blanco_norm',
+        title='Tendencia Semanal de Interceptaciones (media móvil 4 semanas) – Destino 2025',
+        color_discrete_sequence=PALETA_DESTINO
+    )
+
+    return estilo_grafica(fig)
+
+mostrar_figura('tendencia_semanal_destino', tendencia_blancos, grafica_tendencia_semanal_destino)
+
+# ===============================
+# 7. ALERTAS DE PICOS (EWMA / CUSUM)
+# ===============================
+from alertas import DetectorPicos, ARCHIVO_ESTADO
+
+detector = DetectorPicos.cargar(
+    'destino_' + ARCHIVO_ESTADO,
+    dimensiones=['puerto_destino', 'cliente'],
+    col_fecha='interception_date'
+)
+
+alertas = detector.ingerir(detector.nuevas_filas(df))
+detector.guardar('destino_' + ARCHIVO_ESTADO)
+
+print("\n🚨 ALERTAS DE PICOS (filas nuevas)")
+if alertas.empty:
+    print("Sin alertas")
+else:
+    print(alertas.tail(20).to_string(index=False))
+
+# ===============================
+# 8. EXPORTAR KPI A EXCEL
+# ===============================
+from exportar_kpi import registrar_tablas, exportar_libro
+
+tablas_kpi = {
+    'calidad_datos': perfil.reporte(),
+    'blancos_2025': dist_blancos_2025.sort_values('interceptaciones', ascending=False),
+    'historico_blancos': hist_blancos,
+    'top10_paises': pais_2025,
+    'top10_clientes': clientes_2025,
+    'top10_productos': productos_2025,
+    'detalle_cliente': (
+        df
+        .groupby(['ano', 'cliente', 'blanco_norm'])
+        .size()
+        .reset_index(name='interceptaciones')
+    ),
+    'detalle_puerto': (
+        df
+        .groupby(['ano', 'puerto_destino', 'blanco_norm'])
+        .size()
+        .reset_index(name='interceptaciones')
+    ),
+    'semanal_puerto': kpi_temporal.tendencia('puerto_destino', frecuencia='semanal')
+}
+
+registrar_tablas('Destino', tablas_kpi)
+ruta_kpi = exportar_libro()
+if ruta_kpi is not None:
+    print(f"\n📁 KPI exportados a {ruta_kpi}")
@@ -0,0 +1,118 @@
+import os
+import shutil
+import webbrowser
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+
+from cache_figuras import CacheFiguras, huella, rc_relevantes, renderizar
+
+# ===============================
+# RENDERIZADO DE GRÁFICAS (CACHE + POOL COMPARTIDO)
+# ===============================
+# mostrar_figura() calcula la llave de la gráfica (nombre, tabla agregada,
+# código que la construye y estilo del reporte); si ya está en cache abre
+# el archivo renderizado, si no construye la figura, la renderiza y la
+# guarda. Sin pool (ejecución normal de un script) todo ocurre en el hilo
+# principal; el ejecutor por lotes inicia un solo pool para ambos reportes
+# y el render plotly + apertura se solapan con el cálculo siguiente.
+# Las figuras de matplotlib se construyen siempre en el hilo principal.
+
+_pool = None
+_pendientes = []
+_cache = None
+_estilo = ()
+
+
+def iniciar_pool(max_workers=4):
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='render'
+        )
+    return _pool
+
+
+def cache():
+    global _cache
+    if _cache is None:
+        _cache = CacheFiguras()
+    return _cache
+
+
+def configurar_estilo(*partes):
+    global _estilo
+    _estilo = partes
+
+
+def _abrir(ruta):
+    webbrowser.open('file://' + os.path.abspath(ruta))
+
+
+def _renderizar_y_abrir(llave, fig):
+    contenido, extension = renderizar(fig)
+    _abrir(cache().guardar(llave, contenido, extension))
+
+
+def mostrar_figura(nombre, datos, construir, *extra):
+    llave = huella(
+        nombre, datos, construir, *extra, *_estilo,
+        rc_relevantes(matplotlib.rcParams)
+    )
+    ruta = cache().obtener(llave)
+
+    if ruta is not None:
+        tarea = (_abrir, ruta)
+    else:
+        fig = construir(datos, *extra)
+        if _pool is None or not hasattr(fig, 'to_html'):
+            contenido, extension = renderizar(fig)
+            tarea = (_abrir, cache().guardar(llave, contenido, extension))
+        else:
+            tarea = (_renderizar_y_abrir, llave, fig)
+
+    if _pool is None:
+        tarea[0](*tarea[1:])
+    else:
+        _pendientes.append(_pool.submit(*tarea))
+
+
+def exportar_figura(nombre, datos, construir, destino, *extra):
+    # variante para procesos trabajadores: misma llave que mostrar_figura,
+    # copia el archivo renderizado a 'destino' (sin extensión) en lugar de
+    # abrirlo y devuelve (llave, archivo) para que el proceso principal lo
+    # registre en el índice de la cache
+    llave = huella(
+        nombre, datos, construir, *extra, *_estilo,
+        rc_relevantes(matplotlib.rcParams)
+    )
+    archivo = cache().buscar(llave)
+    if archivo is not None:
+        try:
+            shutil.copyfile(
+                os.path.join(cache().carpeta, archivo),
+                destino + os.path.splitext(archivo)[1]
+            )
+            return llave, archivo
+        except FileNotFoundError:
+            pass  # expulsado de la cache mientras tanto
+
+    contenido, extension = renderizar(construir(datos, *extra))
+    archivo = cache().escribir(llave, contenido, extension)
+    with open(destino + extension, 'wb') as f:
+        f.write(contenido)
+    return llave, archivo
+
+
+def esperar():
+    while _pendientes:
+        _pendientes.pop(0).result()
+
+
+def cerrar_pool():
+    global _pool
+    esperar()
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
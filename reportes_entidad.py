@@ -0,0 +1,287 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import plotly.express as px
+
+from almacen_columnar import abrir_almacen, guardar_almacen
+from estilo_graficas import (
+    PALETA_DESTINO, PALETA_MORADO, PALETA_MORADO3, ORDEN_BLANCOS,
+    estilo_grafica, mapa_colores
+)
+from renderizado import cache, configurar_estilo, exportar_figura
+
+# ===============================
+# REPORTES POR CLIENTE / PREDIO EN PARALELO
+# ===============================
+# 1. Se parte del almacén columnar que dejaron main.py / mainDestino.py
+#    (datos ya limpios): no se vuelve a leer ni a limpiar el libro.
+# 2. Se agrega una sola vez al grano más fino que usan las gráficas
+#    (entidad, año, mes, blanco, dimensión secundaria), ordenado por
+#    entidad, y se guarda como almacén columnar: cada entidad es un
+#    tramo contiguo de filas.
+# 3. Cada proceso abre ese almacén en modo mmap, lee solo su tramo y
+#    escribe las gráficas (HTML) y el libro KPI de la entidad. Las
+#    gráficas usan el estilo y los colores por blanco del reporte general
+#    y pasan por la cache de figuras (la registra el proceso principal).
+#
+# Uso: python reportes_entidad.py salida cliente [--ano 2025] [--procesos 4]
+
+CARPETA_REPORTES = "reportes_entidad"
+CARPETA_AGREGADO = "_agregado"
+
+ANIO_REPORTE = 2025
+
+REPORTES = {
+    'salida': {
+        'almacen': 'almacen_salida',
+        'fecha': 'fecha',
+        'tallos': 'total_tallos_rechazados',
+        'entidades': {'cliente': 'predio', 'predio': 'cliente'},
+        # mismo estilo (llave de cache) y colores que main.py
+        'estilo': (estilo_grafica, PALETA_MORADO, PALETA_MORADO3,
+                   ORDEN_BLANCOS),
+        'colores': PALETA_MORADO
+    },
+    'destino': {
+        'almacen': 'almacen_destino',
+        'fecha': 'interception_date',
+        'tallos': None,
+        'entidades': {'cliente': 'producto_norm'},
+        'estilo': (estilo_grafica, PALETA_DESTINO),
+        'colores': None
+    }
+}
+
+
+def _nombre_archivo(valor):
+    valor = unicodedata.normalize('NFKD', str(valor))
+    valor = valor.encode('ascii', 'ignore').decode('utf-8')
+    valor = ''.join(c if c.isalnum() else '_' for c in valor.strip())
+    return valor.strip('_').lower() or 'sin_nombre'
+
+
+# ===============================
+# AGREGACIÓN ÚNICA Y PARTICIÓN
+# ===============================
+def agregar_por_entidad(reporte, entidad, carpeta=CARPETA_REPORTES):
+    config = REPORTES[reporte]
+    secundaria = config['entidades'][entidad]
+    almacen = abrir_almacen(config['almacen'])
+
+    columnas = [entidad, secundaria, 'ano', 'blanco_norm', config['fecha']]
+    if config['tallos']:
+        columnas.append(config['tallos'])
+    df = almacen.frame(columnas)
+    df = df[df[entidad].notna()]
+
+    df['mes'] = df[config['fecha']].dt.to_period('M').dt.to_timestamp()
+
+    # sin campo de tallos (destino) no se crea la columna
+    metricas = {'interceptaciones': ('blanco_norm', 'size')}
+    if config['tallos']:
+        metricas['tallos_rechazados'] = (config['tallos'], 'sum')
+
+    agregado = (
+        df.groupby(
+            [entidad, 'ano', 'mes', 'blanco_norm', secundaria],
+            observed=True, dropna=False
+        )
+        .agg(**metricas)
+        .reset_index()
+        .sort_values(entidad, kind='stable')
+        .reset_index(drop=True)
+    )
+
+    ruta = os.path.join(carpeta, CARPETA_AGREGADO)
+    shutil.rmtree(ruta, ignore_errors=True)
+    guardar_almacen(agregado, ruta)
+
+    # tramos [inicio, fin) de cada entidad
+    codigos = agregado[entidad].cat.codes.to_numpy()
+    cortes = np.flatnonzero(np.diff(codigos)) + 1
+    inicios = np.concatenate([[0], cortes]) if len(codigos) else cortes
+    fines = np.concatenate([cortes, [len(codigos)]]) if len(codigos) else cortes
+    nombres = agregado[entidad].iloc[inicios].astype(str).tolist()
+
+    return ruta, list(zip(nombres, inicios.tolist(), fines.tolist()))
+
+
+# ===============================
+# GRÁFICAS DE UNA ENTIDAD
+# ===============================
+def grafica_historico(kpi_anual, nombre, colores):
+    fig = px.bar(
+        kpi_anual, x='ano', y='interceptaciones', color='blanco_norm',
+        barmode='group', text_auto=True,
+        title=f'{nombre} – Interceptaciones por Año',
+        category_orders={'blanco_norm': list(colores)},
+        color_discrete_map=colores
+    )
+    return estilo_grafica(fig)
+
+
+def grafica_mensual(mensual, nombre, anio, colores):
+    fig = px.line(
+        mensual, x='mes', y='interceptaciones', color='blanco_norm',
+        markers=True,
+        title=f'{nombre} – Interceptaciones Mensuales {anio}',
+        category_orders={'blanco_norm': list(colores)},
+        color_discrete_map=colores
+    )
+    return estilo_grafica(fig)
+
+
+def grafica_secundaria(por_secundaria, nombre, secundaria, anio, colores):
+    fig = px.bar(
+        por_secundaria, x=secundaria, y='interceptaciones',
+        color='blanco_norm', text_auto=True,
+        title=f'{nombre} – Interceptaciones por {secundaria} {anio}',
+        category_orders={'blanco_norm': list(colores)},
+        color_discrete_map=colores
+    )
+    return estilo_grafica(fig)
+
+
+# ===============================
+# REPORTE DE UNA ENTIDAD (proceso trabajador)
+# ===============================
+def generar_reporte(ruta_agregado, reporte, nombre, inicio, fin, secundaria,
+                    anio, colores, destino):
+    from exportar_kpi import LibroKPI
+
+    configurar_estilo(*REPORTES[reporte]['estilo'])
+
+    datos = abrir_almacen(ruta_agregado).frame(filas=slice(inicio, fin))
+    os.makedirs(destino, exist_ok=True)
+
+    metricas = [
+        c for c in ('interceptaciones', 'tallos_rechazados')
+        if c in datos.columns
+    ]
+    del_anio = datos[datos['ano'] == anio]
+
+    kpi_anual = (
+        datos.groupby(['ano', 'blanco_norm'], observed=True)
+        [metricas].sum()
+        .reset_index()
+    )
+    mensual = (
+        del_anio.groupby(['mes', 'blanco_norm'], observed=True)
+        ['interceptaciones'].sum()
+        .reset_index()
+    )
+    por_secundaria = (
+        del_anio.groupby([secundaria, 'blanco_norm'], observed=True)
+        ['interceptaciones'].sum()
+        .reset_index()
+        .sort_values('interceptaciones', ascending=False)
+    )
+
+    ruta = lambda archivo: os.path.join(destino, archivo)
+    figuras = [
+        exportar_figura(f'{reporte}_historico', kpi_anual, grafica_historico,
+                        ruta('historico'), nombre, colores),
+        exportar_figura(f'{reporte}_mensual', mensual, grafica_mensual,
+                        ruta('mensual'), nombre, anio, colores),
+        exportar_figura(f'{reporte}_{secundaria}', por_secundaria,
+                        grafica_secundaria, ruta(secundaria), nombre,
+                        secundaria, anio, colores)
+    ]
+
+    with LibroKPI(ruta('kpi.xlsx')) as libro:
+        libro.agregar_hoja('kpi_anual', kpi_anual)
+        libro.agregar_hoja(f'mensual_{anio}', mensual)
+        libro.agregar_hoja(f'{secundaria}_{anio}', por_secundaria)
+
+    return nombre, figuras
+
+
+# ===============================
+# REPARTO EN EL POOL CON PROGRESO
+# ===============================
+def generar_reportes(reporte, entidad, anio=ANIO_REPORTE, procesos=None,
+                     carpeta=CARPETA_REPORTES):
+    inicio = time.perf_counter()
+    ruta_agregado, tramos = agregar_por_entidad(reporte, entidad, carpeta)
+    t_agregado = time.perf_counter() - inicio
+    print(f"✅ Agregado único: {len(tramos)} {entidad}s en {t_agregado:.2f} s")
+
+    config = REPORTES[reporte]
+    secundaria = config['entidades'][entidad]
+    # colores fijos por blanco para todas las entidades del reporte
+    colores = mapa_colores(
+        abrir_almacen(ruta_agregado).diccionarios['blanco_norm'],
+        config['colores']
+    )
+    salida = os.path.join(carpeta, f'{reporte}_{entidad}')
+    shutil.rmtree(salida, ignore_errors=True)
+    os.makedirs(salida)
+
+    # una carpeta por entidad (nombres que colisionan llevan sufijo)
+    carpetas = {}
+    for nombre, _, _ in tramos:
+        base = _nombre_archivo(nombre)
+        archivo, i = base, 2
+        while archivo in carpetas.values():
+            archivo, i = f'{base}_{i}', i + 1
+        carpetas[nombre] = archivo
+
+    total = len(tramos)
+    hechos = 0
+    inicio_pool = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [
+            pool.submit(generar_reporte, ruta_agregado, reporte, nombre, a, b,
+                        secundaria, anio, colores,
+                        os.path.join(salida, carpetas[nombre]))
+            for nombre, a, b in tramos
+        ]
+        for futuro in as_completed(futuros):
+            _, figuras = futuro.result()
+            for llave, archivo in figuras:
+                cache().registrar(llave, archivo)
+            hechos += 1
+            transcurrido = time.perf_counter() - inicio_pool
+            print(
+                f"\r⏳ {hechos}/{total} reportes "
+                f"({hechos / total:.0%}) – {hechos / transcurrido:.1f} rep/s",
+                end='', flush=True
+            )
+    print()
+
+    transcurrido = time.perf_counter() - inicio
+    print(f"📁 Reportes en {salida}")
+    print(
+        f"⏱️ {total} reportes en {transcurrido:.2f} s "
+        f"({total / transcurrido:.1f} rep/s)"
+    )
+    return salida
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(
+        description="Reportes por cliente o predio en paralelo"
+    )
+    parser.add_argument('reporte', choices=list(REPORTES))
+    parser.add_argument('entidad', choices=['cliente', 'predio'])
+    parser.add_argument('--ano', type=int, default=ANIO_REPORTE)
+    parser.add_argument('--procesos', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.entidad not in REPORTES[args.reporte]['entidades']:
+        parser.error(f"el reporte {args.reporte} no tiene {args.entidad}")
+    if not os.path.exists(REPORTES[args.reporte]['almacen']):
+        parser.error(
+            f"no existe {REPORTES[args.reporte]['almacen']}: "
+            "ejecute primero el script del reporte"
+        )
+
+    generar_reportes(args.reporte, args.entidad, args.ano, args.procesos)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# ===============================
+# PUNTAJE DE RIESGO NORMALIZADO
+# ===============================
+# tasa = interceptaciones ponderadas por blanco / volumen de la entidad
+# Se suaviza hacia la tasa global (prior con peso VOLUMEN_PRIOR) para que
+# una finca pequeña con una sola interceptación no quede de primera.
+
+PESOS_BLANCO = {
+    'Trips': 1.0,
+    'Afidos': 0.8,
+    'Acaros': 0.6,
+    'Thysanoptera': 1.0,
+    'Hemiptera': 0.8,
+    'Acari': 0.6
+}
+PESO_DEFECTO = 0.5
+
+POR_MIL = 1000
+
+
+def calcular_riesgo(df, entidad, pesos=None, col_blanco='blanco_norm',
+                    col_eventos='cuenta', col_volumen='total_piezas',
+                    volumen=None, volumen_prior=None, por=POR_MIL):
+    pesos = dict(PESOS_BLANCO, **(pesos or {}))
+
+    eventos = (
+        pd.to_numeric(df[col_eventos], errors='coerce')
+        if col_eventos in df.columns
+        else pd.Series(1, index=df.index)
+    )
+    # una fila es al menos una interceptación aunque 'cuenta' venga
+    # vacía o forzada a 0
+    eventos = eventos.where(eventos > 0, 1)
+
+    # matriz entidad x blanco con los eventos (una sola agregación)
+    matriz = (
+        pd.DataFrame({
+            entidad: df[entidad],
+            'blanco': df[col_blanco].astype(str),
+            'eventos': eventos
+        })
+        .groupby([entidad, 'blanco'])['eventos']
+        .sum()
+        .unstack('blanco', fill_value=0)
+    )
+
+    vector_pesos = np.array([pesos.get(b, PESO_DEFECTO) for b in matriz.columns])
+    ponderada = matriz * vector_pesos
+
+    # volumen: libro de exportaciones si se entrega, si no la columna del df
+    if volumen is None:
+        volumen = (
+            pd.to_numeric(df[col_volumen], errors='coerce')
+            .fillna(0)
+            .groupby(df[entidad])
+            .sum()
+        )
+    volumen = volumen.reindex(matriz.index, fill_value=0).astype(float)
+
+    if volumen_prior is None:
+        positivos = volumen[volumen > 0]
+        volumen_prior = float(positivos.median()) if len(positivos) else 1.0
+
+    total_ponderado = ponderada.sum(axis=1)
+    tasas_globales = ponderada.sum() / max(volumen.sum(), 1.0)
+    tasa_global = tasas_globales.sum()
+    denominador = volumen + volumen_prior
+
+    tabla = matriz.add_prefix('eventos_')
+    tabla.columns.name = None
+    tabla['eventos_ponderados'] = total_ponderado
+    tabla['volumen'] = volumen
+    tabla['tasa'] = (
+        (total_ponderado + tasa_global * volumen_prior) / denominador * por
+    )
+
+    # el prior se reparte por blanco: las tasas por blanco suman 'tasa'
+    tasas_blanco = (
+        (ponderada + tasas_globales * volumen_prior)
+        .div(denominador, axis=0) * por
+    )
+    for b in matriz.columns:
+        tabla[f'tasa_{b}'] = tasas_blanco[b]
+
+    maximo = tabla['tasa'].max()
+    tabla['indice'] = tabla['tasa'] / maximo * 100 if maximo > 0 else 0.0
+    tabla['ranking'] = (
+        tabla['tasa'].rank(ascending=False, method='first').astype(int)
+    )
+    return tabla
+
+
+# ===============================
+# SELECCIÓN DE LOS N MÁS RIESGOSOS (parcial, sin ordenar todo)
+# ===============================
+def top_riesgo(tabla, n=15):
+    return tabla.nlargest(n, 'tasa')
+
+
+def ranking_completo(tabla):
+    return tabla.sort_values('ranking')
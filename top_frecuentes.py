@@ -0,0 +1,271 @@
+import json
+
+import pandas as pd
+
+# ===============================
+# TOP-K EN STREAMING (SPACE-SAVING)
+# ===============================
+# Por cada columna (cliente, predio, puerto, producto...) y cada grupo
+# (año, blanco) se guarda un resumen de a lo sumo CAPACIDAD contadores
+# [conteo, error]. Los bloques de filas se agregan a medida que llegan;
+# los resúmenes de varios archivos o procesos se combinan sumando.
+# El top se pide combinando los grupos del filtro (p. ej. 2023-2025,
+# Trips + Afidos) y los candidatos se recuentan de forma exacta; si un
+# valor ya expulsado del resumen todavía podría entrar al top, se cuenta
+# la columna completa.
+
+CAPACIDAD = 100      # contadores por resumen (muy por encima del top-10)
+GRUPOS = ['ano', 'blanco_norm']
+
+
+# ===============================
+# RESUMEN DE UNA COLUMNA EN UN GRUPO
+# ===============================
+class ResumenFrecuentes:
+
+    def __init__(self, capacidad=CAPACIDAD):
+        self.capacidad = capacidad
+        # valor -> [conteo, error]; conteo - error <= real <= conteo
+        self.contadores = {}
+        # un valor no monitoreado pudo aparecer hasta 'ausentes' veces
+        self.ausentes = 0
+
+    def agregar(self, valor, peso=1):
+        contador = self.contadores.get(valor)
+        if contador is not None:
+            contador[0] += peso
+        elif len(self.contadores) < self.capacidad:
+            self.contadores[valor] = [peso, 0]
+        else:
+            # reemplaza al menor: hereda su conteo como error
+            menor = min(self.contadores, key=lambda v: self.contadores[v][0])
+            base = self.contadores.pop(menor)[0]
+            self.ausentes = max(self.ausentes, base)
+            self.contadores[valor] = [base + peso, base]
+
+    def combinar(self, otro):
+        a1, a2 = self.ausentes, otro.ausentes
+        combinado = ResumenFrecuentes(max(self.capacidad, otro.capacidad))
+        combinado.ausentes = a1 + a2
+        for valor in self.contadores.keys() | otro.contadores.keys():
+            c1, e1 = self.contadores.get(valor, (a1, a1))
+            c2, e2 = otro.contadores.get(valor, (a2, a2))
+            combinado.contadores[valor] = [c1 + c2, e1 + e2]
+
+        if len(combinado.contadores) > combinado.capacidad:
+            orden = sorted(
+                combinado.contadores.items(),
+                key=lambda item: item[1][0],
+                reverse=True
+            )
+            combinado.contadores = dict(orden[:combinado.capacidad])
+            combinado.ausentes = max(
+                combinado.ausentes, orden[combinado.capacidad][1][0]
+            )
+        return combinado
+
+    def candidatos(self, k):
+        # todo valor del top-k real tiene conteo >= k-ésima cota inferior;
+        # None si un valor no monitoreado también podría alcanzarla
+        inferiores = sorted(
+            (c[0] - c[1] for c in self.contadores.values()), reverse=True
+        )
+        corte = inferiores[k - 1] if len(inferiores) >= k else 0
+        if self.ausentes and self.ausentes >= corte:
+            return None
+        return [v for v, c in self.contadores.items() if c[0] >= corte]
+
+    def tabla(self):
+        tabla = pd.DataFrame(
+            [(v, c[0], c[1]) for v, c in self.contadores.items()],
+            columns=['valor', 'conteo', 'error']
+        )
+        return tabla.sort_values('conteo', ascending=False, kind='stable')
+
+
+# ===============================
+# RESÚMENES POR COLUMNA Y GRUPO
+# ===============================
+class TopKStreaming:
+
+    def __init__(self, columnas, grupos=GRUPOS, capacidad=CAPACIDAD):
+        self.columnas = list(columnas)
+        self.grupos = list(grupos)
+        self.capacidad = capacidad
+        # (columna, grupo) -> ResumenFrecuentes
+        self.resumenes = {}
+
+    # -------------------------------
+    # Ingesta por bloques
+    # -------------------------------
+    def actualizar(self, bloque, col_peso=None):
+        for col in self.columnas:
+            if col not in bloque.columns:
+                continue
+            llaves = self.grupos + [col]
+            agrupado = bloque.groupby(llaves, observed=True)
+            conteos = agrupado[col_peso].sum() if col_peso else agrupado.size()
+            # los más frecuentes primero reduce el error del resumen
+            conteos = conteos[conteos > 0].sort_values(ascending=False)
+
+            for llave, peso in zip(conteos.index, conteos.tolist()):
+                *grupo, valor = llave
+                resumen = self.resumenes.get((col, tuple(grupo)))
+                if resumen is None:
+                    resumen = self.resumenes[(col, tuple(grupo))] = (
+                        ResumenFrecuentes(self.capacidad)
+                    )
+                resumen.agregar(valor, peso)
+        return self
+
+    def combinar(self, otro):
+        for llave, resumen in otro.resumenes.items():
+            propio = self.resumenes.get(llave)
+            self.resumenes[llave] = (
+                resumen if propio is None else propio.combinar(resumen)
+            )
+        return self
+
+    # -------------------------------
+    # Consulta
+    # -------------------------------
+    def _coincide(self, grupo, filtros):
+        for nombre, valor in zip(self.grupos, grupo):
+            if nombre not in filtros:
+                continue
+            permitidos = filtros[nombre]
+            if not isinstance(permitidos, (list, tuple, set)):
+                permitidos = [permitidos]
+            if valor not in permitidos:
+                return False
+        return True
+
+    def resumen(self, columna, **filtros):
+        combinado = ResumenFrecuentes(self.capacidad)
+        for (col, grupo), resumen in self.resumenes.items():
+            if col == columna and self._coincide(grupo, filtros):
+                combinado = combinado.combinar(resumen)
+        return combinado
+
+    def estimar(self, columna, k=10, **filtros):
+        return self.resumen(columna, **filtros).tabla().head(k)
+
+    def top(self, columna, datos, k=10, **filtros):
+        # recuento exacto solo de los candidatos (segunda pasada); sin
+        # candidatos seguros se cuentan todos los valores
+        candidatos = self.resumen(columna, **filtros).candidatos(k)
+        if isinstance(datos, pd.DataFrame):
+            datos = [datos]
+
+        partes = []
+        for bloque in datos:
+            mascara = (
+                bloque[columna].isin(candidatos) if candidatos is not None
+                else bloque[columna].notna()
+            )
+            for nombre, valor in filtros.items():
+                if not isinstance(valor, (list, tuple, set)):
+                    valor = [valor]
+                mascara &= bloque[nombre].isin(valor)
+            partes.append(bloque.loc[mascara, columna].value_counts(sort=False))
+
+        if not partes:
+            return pd.Series(dtype=int, name='interceptaciones')
+        # empates: primero el valor que aparece antes en los datos
+        return (
+            pd.concat(partes)
+            .groupby(level=0, sort=False)
+            .sum()
+            .sort_values(ascending=False, kind='stable')
+            .head(k)
+            .rename_axis(columna)
+            .rename('interceptaciones')
+        )
+
+    # -------------------------------
+    # Persistencia (estado pequeño y combinable)
+    # -------------------------------
+    def guardar(self, ruta):
+        datos = {
+            'columnas': self.columnas,
+            'grupos': self.grupos,
+            'capacidad': self.capacidad,
+            'resumenes': [
+                [col, list(grupo), list(resumen.contadores.items()),
+                 resumen.ausentes]
+                for (col, grupo), resumen in self.resumenes.items()
+            ]
+        }
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, separators=(',', ':'),
+                      default=lambda v: v.item())
+
+    @classmethod
+    def cargar(cls, ruta):
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        top_k = cls(datos['columnas'], datos['grupos'], datos['capacidad'])
+        for col, grupo, contadores, ausentes in datos['resumenes']:
+            resumen = ResumenFrecuentes(top_k.capacidad)
+            resumen.contadores = {v: list(c) for v, c in contadores}
+            resumen.ausentes = ausentes
+            top_k.resumenes[(col, tuple(grupo))] = resumen
+        return top_k
+
+
+
+# ===============================
+# VERIFICACIÓN CONTRA value_counts()
+# ===============================
+# python top_frecuentes.py: compara los conteos del top con value_counts()
+# en datos sintéticos donde el resumen expulsa valores del top real.
+def verificar(datos, columna, k=10, capacidad=CAPACIDAD, tamano_bloque=None,
+              **filtros):
+    tamano_bloque = tamano_bloque or max(len(datos) // 20, 1)
+    bloques = [
+        datos.iloc[i:i + tamano_bloque]
+        for i in range(0, len(datos), tamano_bloque)
+    ]
+    top_k = TopKStreaming([columna], capacidad=capacidad)
+    for bloque in bloques:
+        top_k.actualizar(bloque)
+
+    mascara = datos[columna].notna()
+    for nombre, valor in filtros.items():
+        if not isinstance(valor, (list, tuple, set)):
+            valor = [valor]
+        mascara &= datos[nombre].isin(valor)
+    esperado = datos.loc[mascara, columna].value_counts().head(k)
+    obtenido = top_k.top(columna, bloques, k, **filtros)
+
+    # los empates en el corte pueden elegir otro valor, no otro conteo
+    assert list(obtenido.values) == list(esperado.values), (obtenido, esperado)
+    for valor, n in obtenido.items():
+        assert (datos.loc[mascara, columna] == valor).sum() == n, valor
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    azar = np.random.default_rng(0)
+    n = 60_000
+    base = pd.DataFrame({
+        'ano': azar.integers(2023, 2026, n),
+        'blanco_norm': azar.choice(['Trips', 'Afidos'], n)
+    })
+
+    # distribución casi plana: 600 clientes con capacidad 100
+    plana = base.assign(cliente=azar.integers(0, 600, n).astype(str))
+    verificar(plana, 'cliente')
+    verificar(plana, 'cliente', ano=2025)
+    verificar(plana, 'cliente', ano=[2023, 2024], blanco_norm='Trips')
+
+    # Zipf con capacidad pequeña
+    for prueba in range(30):
+        zipf = base.assign(
+            cliente=(azar.zipf(1.3, n) % 5000).astype(str)
+        )
+        verificar(zipf, 'cliente', capacidad=30)
+        verificar(zipf, 'cliente', capacidad=30, ano=2025, blanco_norm='Afidos')
+
+    print("✅ top() coincide con value_counts()")
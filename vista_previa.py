@@ -0,0 +1,139 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from carga import nombres_encabezado, tipar_columnas
+
+# ===============================
+# VISTA PREVIA: MUESTREO ESTRATIFICADO CON INTERVALOS DE CONFIANZA
+# ===============================
+# La hoja se recorre en streaming (openpyxl read_only) y por cada estrato
+# (año, blanco biológico) se guarda una reserva aleatoria de tamaño fijo.
+# Cada fila muestreada lleva el total y el tamaño de muestra de su estrato,
+# así los conteos se estiman con el estimador estratificado y su error
+# estándar aunque la limpieza descarte filas después.
+
+TAMANO_ESTRATO = 50
+Z_95 = 1.96
+
+COL_ESTRATO = 'estrato'
+COL_TOTAL = 'total_estrato'
+COL_MUESTRA = 'muestra_estrato'
+
+
+def _clave(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip().upper()
+
+
+def muestrear_hoja(archivo, hoja, requeridos, columnas_estrato,
+                   tamano_estrato=TAMANO_ESTRATO, semilla=0, normalizar=None):
+    # normalizar: {columna: función} para estratificar por el valor ya
+    # normalizado (p. ej. el blanco) y no por cada variante escrita
+    normalizar = normalizar or {}
+    from openpyxl import load_workbook
+
+    azar = random.Random(semilla)
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro[hoja].iter_rows(values_only=True)
+
+        # fila de encabezados (mismo criterio que carga.detectar_encabezado)
+        requeridos = set(requeridos)
+        encabezado = None
+        for fila in filas:
+            if requeridos <= {str(v).upper() for v in fila}:
+                encabezado = fila
+                break
+        if encabezado is None:
+            raise ValueError("❌ No se encontró la fila de encabezados")
+
+        nombres = nombres_encabezado(encabezado)
+        mayusculas = [n.upper() for n in nombres]
+        posiciones = [mayusculas.index(c.upper()) for c in columnas_estrato]
+        funciones = [normalizar.get(c, _clave) for c in columnas_estrato]
+
+        # reservas por estrato (algoritmo R)
+        reservas = {}
+        vistos = {}
+        for fila in filas:
+            if all(v is None for v in fila):
+                continue
+            clave = tuple(f(fila[i]) for f, i in zip(funciones, posiciones))
+            n = vistos.get(clave, 0) + 1
+            vistos[clave] = n
+            reserva = reservas.setdefault(clave, [])
+            if len(reserva) < tamano_estrato:
+                reserva.append(fila)
+            else:
+                j = azar.randrange(n)
+                if j < tamano_estrato:
+                    reserva[j] = fila
+    finally:
+        libro.close()
+
+    registros = []
+    for estrato, (clave, reserva) in enumerate(reservas.items()):
+        for fila in reserva:
+            fila = list(fila) + [None] * (len(nombres) - len(fila))
+            registros.append(
+                fila[:len(nombres)] + [estrato, vistos[clave], len(reserva)]
+            )
+
+    muestra = pd.DataFrame(
+        registros,
+        columns=nombres + [COL_ESTRATO, COL_TOTAL, COL_MUESTRA]
+    )
+    muestra = tipar_columnas(muestra)
+
+    print(
+        f"🔎 Vista previa: {len(muestra):,} de {sum(vistos.values()):,} "
+        f"filas en {len(reservas)} estratos"
+    )
+    return muestra
+
+
+# ===============================
+# ESTIMADOR ESTRATIFICADO DE CONTEOS
+# ===============================
+def estimar_conteos(muestra, grupo, z=Z_95):
+    if isinstance(grupo, str):
+        grupo = [grupo]
+
+    t = (
+        muestra
+        .groupby(grupo + [COL_ESTRATO, COL_TOTAL, COL_MUESTRA], observed=True)
+        .size()
+        .rename('t')
+        .reset_index()
+    )
+    N = t[COL_TOTAL].astype(float)
+    n = t[COL_MUESTRA].astype(float)
+
+    # y es 0/1 (la fila pertenece o no al grupo): sum(y) = sum(y²) = t
+    s2 = ((t['t'] - t['t'] ** 2 / n) / (n - 1)).where(n > 1, 0.0)
+    t['estimado'] = N / n * t['t']
+    t['varianza'] = N ** 2 * (1 - n / N) * s2 / n
+
+    tabla = t.groupby(grupo, observed=True)[['estimado', 'varianza']].sum()
+    tabla['error_std'] = np.sqrt(tabla['varianza'])
+    tabla['ic_inf'] = (tabla['estimado'] - z * tabla['error_std']).clip(lower=0)
+    tabla['ic_sup'] = tabla['estimado'] + z * tabla['error_std']
+    return (
+        tabla
+        .drop(columns='varianza')
+        .sort_values('estimado', ascending=False)
+    )
+
+
+def estimar_proporciones(muestra, grupo, z=Z_95):
+    tabla = estimar_conteos(muestra, grupo, z)
+    total = tabla['estimado'].sum()
+    # aproximación: el total del dominio se trata como fijo
+    for col in ['estimado', 'error_std', 'ic_inf', 'ic_sup']:
+        tabla[f'{col}_%'] = tabla[col] / total * 100 if total else 0.0
+    return tabla
@@ -0,0 +1,214 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from almacen_columnar import ARCHIVO_META, abrir_almacen, guardar_almacen
+
+# ===============================
+# LIBRO DE EXPORTACIONES (tallos despachados por predio / cliente / fecha)
+# ===============================
+# El libro se lee por bloques, se agrega por día/predio/cliente y se guarda
+# en el almacén columnar (un .npy por columna + diccionarios), ordenado
+# por llave para que los cruces con las interceptaciones sean merges sobre
+# índices ya ordenados.
+
+COLUMNAS_LIBRO = {
+    'fecha': 'fecha',
+    'predio': 'predio',
+    'cliente': 'cliente',
+    'tallos': 'tallos'
+}
+
+LLAVES = ['fecha', 'predio', 'cliente']
+CATEGORICAS = ['predio', 'cliente']
+
+TAMANO_BLOQUE = 1_000_000
+
+
+# -------------------------------
+# Limpieza vectorizada (misma regla que limpiar_texto de los reportes)
+# Solo se limpian los valores únicos y luego se recodifica.
+# -------------------------------
+def limpiar_categorias(serie):
+    serie = serie.astype('category')
+    categorias = serie.cat.categories
+    if len(categorias) == 0:
+        return serie
+
+    limpias = (
+        pd.Index(categorias.astype(str))
+        .str.strip()
+        .str.normalize('NFKD')
+        .str.encode('ascii', 'ignore')
+        .str.decode('utf-8')
+        .str.title()
+    )
+    unicas, recodigo = np.unique(np.asarray(limpias), return_inverse=True)
+
+    codigos = serie.cat.codes.to_numpy()
+    nuevos = np.where(codigos >= 0, recodigo[np.maximum(codigos, 0)], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(nuevos, unicas),
+        index=serie.index
+    )
+
+
+# -------------------------------
+# Lectura por bloques
+# -------------------------------
+def _leer_bloques(ruta, columnas, tamano_bloque):
+    usecols = list(columnas.values())
+    if ruta.lower().endswith(('.xlsx', '.xls')):
+        yield pd.read_excel(ruta, usecols=usecols)
+        return
+    yield from pd.read_csv(
+        ruta,
+        usecols=usecols,
+        dtype={columnas['predio']: 'category', columnas['cliente']: 'category'},
+        chunksize=tamano_bloque
+    )
+
+
+def _agregar_bloque(bloque, columnas):
+    bloque = bloque.rename(columns={v: k for k, v in columnas.items()})
+    bloque['fecha'] = (
+        pd.to_datetime(bloque['fecha'], dayfirst=True, errors='coerce')
+        .dt.normalize()
+    )
+    bloque['tallos'] = pd.to_numeric(bloque['tallos'], errors='coerce').fillna(0)
+    for c in CATEGORICAS:
+        bloque[c] = limpiar_categorias(bloque[c])
+
+    # predio / cliente vacíos se conservan (NaN): cuentan en los totales
+    # por año y mes aunque no se atribuyan a ninguna entidad
+    return (
+        bloque[bloque['fecha'].notna()]
+        .groupby(LLAVES, observed=True, sort=False, dropna=False)['tallos']
+        .sum()
+    )
+
+
+def ingerir_libro(ruta_origen, ruta_destino=None, columnas=None,
+                  tamano_bloque=TAMANO_BLOQUE):
+    columnas = dict(COLUMNAS_LIBRO, **(columnas or {}))
+
+    parciales = [
+        _agregar_bloque(bloque, columnas)
+        for bloque in _leer_bloques(ruta_origen, columnas, tamano_bloque)
+    ]
+    # los bloques pueden traer categorías distintas: se unifican como
+    # objetos (los vacíos siguen siendo NaN, no el texto 'nan')
+    libro = (
+        pd.concat([p.reset_index() for p in parciales], ignore_index=True)
+        .astype({c: object for c in CATEGORICAS})
+        .groupby(LLAVES, sort=True, dropna=False)['tallos']
+        .sum()
+        .reset_index()
+    )
+    for c in CATEGORICAS:
+        libro[c] = libro[c].astype('category')
+
+    if ruta_destino is not None:
+        guardar_columnar(libro, ruta_destino)
+    return libro
+
+
+# ===============================
+# ALMACENAMIENTO COLUMNAR
+# ===============================
+def guardar_columnar(libro, ruta):
+    guardar_almacen(libro, ruta, LLAVES + ['tallos'])
+
+
+def cargar_columnar(ruta, mmap=True):
+    return abrir_almacen(ruta, mmap=mmap).frame(LLAVES + ['tallos'])
+
+
+# -------------------------------
+# Usa la copia columnar si está al día; si no, vuelve a ingerir el libro
+# -------------------------------
+def cargar_libro(ruta_origen, ruta_columnar, **kwargs):
+    marca = os.path.join(ruta_columnar, ARCHIVO_META)
+    existe_origen = os.path.exists(ruta_origen)
+
+    if os.path.exists(marca) and (
+        not existe_origen
+        or os.path.getmtime(marca) >= os.path.getmtime(ruta_origen)
+    ):
+        return cargar_columnar(ruta_columnar)
+
+    if existe_origen:
+        ingerir_libro(ruta_origen, ruta_columnar, **kwargs)
+        return cargar_columnar(ruta_columnar)
+
+    return None
+
+
+# ===============================
+# PÉRDIDA PORCENTUAL POR NIVEL
+# ===============================
+def _llaves_tiempo(df, col_fecha, col_ano=None):
+    fechas = pd.to_datetime(df[col_fecha], errors='coerce')
+    # el año del reporte es la columna 'ano' cuando existe (puede no
+    # coincidir con la fecha o tener fecha vacía)
+    if col_ano is not None and col_ano in df.columns:
+        ano = pd.to_numeric(df[col_ano], errors='coerce')
+    else:
+        ano = fechas.dt.year
+    return {
+        'ano': ano.astype('Int64'),
+        'mes': fechas.dt.to_period('M').dt.to_timestamp()
+    }
+
+
+def _agregar(df, niveles, col_fecha, col_tallos, col_ano=None):
+    tiempo = _llaves_tiempo(df, col_fecha, col_ano)
+    llaves = [tiempo[n].rename(n) if n in tiempo else df[n] for n in niveles]
+    tallos = pd.to_numeric(df[col_tallos], errors='coerce').fillna(0)
+    agregado = tallos.groupby(llaves, sort=True, observed=True).sum()
+
+    # las llaves de texto se comparan como str (categorías u objetos)
+    indice = agregado.index
+    if isinstance(indice, pd.MultiIndex):
+        agregado.index = indice.set_levels([
+            nivel.astype(str) if nombre not in tiempo else nivel
+            for nombre, nivel in zip(indice.names, indice.levels)
+        ])
+    elif niveles[0] not in tiempo:
+        agregado.index = indice.astype(str)
+    # ambos lados llegan ordenados al merge
+    return agregado.sort_index()
+
+
+def perdida_por(df, libro, niveles, col_fecha='fecha',
+                col_tallos='total_tallos_rechazados', col_ano='ano'):
+    if isinstance(niveles, str):
+        niveles = [niveles]
+
+    exportados = _agregar(libro, niveles, 'fecha', 'tallos')
+    rechazados = _agregar(df, niveles, col_fecha, col_tallos, col_ano)
+
+    tabla = pd.merge(
+        exportados.rename('tallos_exportados'),
+        rechazados.rename('tallos_rechazados'),
+        left_index=True,
+        right_index=True,
+        how='outer',
+        sort=False
+    ).fillna(0)
+
+    tabla['perdida_%'] = (
+        tabla['tallos_rechazados']
+        / tabla['tallos_exportados'].where(tabla['tallos_exportados'] > 0)
+        * 100
+    )
+    return tabla
+
+
+def volumen_por(libro, entidad, ano=None):
+    if ano is not None:
+        libro = libro[libro['fecha'].dt.year == ano]
+    volumen = libro.groupby(entidad, observed=True)['tallos'].sum()
+    volumen.index = volumen.index.astype(str)
+    return volumen